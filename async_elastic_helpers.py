@@ -0,0 +1,643 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple, List, Dict, Any, Iterable, AsyncIterator, Union
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.exceptions import NotFoundError
+from elasticsearch.helpers import async_scan, async_streaming_bulk
+from elastic_helpers import ESQueryMaker, BULK_LOAD_SETTINGS, bulk_item_error, get_es_connection, release_es_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AsyncESConnector:
+    """
+    Async counterpart of ESConnector, built on AsyncElasticsearch. Every method that talks
+    to the cluster is a coroutine, so searches and bulk writes can overlap with other work
+    on the event loop. Instances for the same cluster share one client from the connection
+    registry. Call close() before the loop shuts down.
+    """
+
+    def __init__(self, cloud_id: str, credentials: Optional[Tuple[str, str]] = None):
+        """
+        Initialize the AsyncESConnector.
+
+        Args:
+            cloud_id (str): The cloud ID of the Elasticsearch deployment.
+            credentials (Optional[Tuple[str, str]]): A tuple containing the username and password for authentication.
+        """
+        self.cloud_id = cloud_id
+        self.credentials = credentials
+
+    @property
+    def conn(self) -> AsyncElasticsearch:
+        return self.create_es_connection()
+
+    def create_es_connection(self) -> AsyncElasticsearch:
+        """
+        Get the shared async client for the Elasticsearch cluster. No connection is
+        opened until the first request.
+
+        Returns:
+            AsyncElasticsearch: An async Elasticsearch client instance.
+        """
+        return get_es_connection(self.cloud_id, self.credentials, client_class=AsyncElasticsearch)
+
+    async def close(self) -> None:
+        """Close the shared async client for this cluster; closing it twice is a no-op."""
+        conn = release_es_connection(self.cloud_id, self.credentials, client_class=AsyncElasticsearch)
+        if conn is not None:
+            await conn.close()
+
+    async def ping(self) -> None:
+        if await self.conn.ping():
+            print("Ping successful: Connected to Elasticsearch!")
+        else:
+            print("Ping unsuccessful: Elasticsearch is not available!")
+
+    async def print_indices(self) -> None:
+        indices = await self.conn.indices.get_alias(index="*")
+        for index in indices:
+            print(index)
+
+    async def get_cluster_health(self, printOnly=False) -> dict[str, Any]:
+        """
+        Get the health status of the cluster.
+
+        Returns:
+            dict: The health status of the cluster.
+        """
+        try:
+            health = await self.conn.cluster.health()
+            logger.info(f"Cluster health retrieved successfully: \n\n {str(health)}")
+            if not printOnly:
+                return health
+        except Exception as e:
+            logger.error(f"An error occurred while retrieving cluster health: {e}")
+            return {}
+
+    async def get_index_settings(self, index_name: str) -> dict[str, Any]:
+        """
+        Get the settings of an index.
+
+        Args:
+            index_name (str): The name of the index.
+
+        Returns:
+            dict: The settings of the index.
+        """
+        try:
+            settings = await self.conn.indices.get_settings(index=index_name)
+            logger.info(f"Settings for index {index_name} retrieved successfully.")
+            return settings
+        except NotFoundError:
+            logger.warning(f"Index {index_name} not found.")
+            return {}
+        except Exception as e:
+            logger.error(f"An error occurred while retrieving settings for index {index_name}: {e}")
+            return {}
+
+    async def update_index_settings(self, index_name: str, new_settings: dict[str, Any]) -> None:
+        """
+        Update the settings of an index.
+
+        Args:
+            index_name (str): The name of the index.
+            new_settings (dict): The new settings to apply to the index.
+        """
+        try:
+            await self.conn.indices.put_settings(index=index_name, settings=new_settings)
+            logger.info(f"Settings for index {index_name} updated successfully.")
+        except NotFoundError:
+            logger.warning(f"Index {index_name} not found.")
+        except Exception as e:
+            logger.error(f"An error occurred while updating settings for index {index_name}: {e}")
+
+    async def check_index_existence(self, index_name) -> bool:
+        return bool(await self.conn.indices.exists(index=index_name))
+
+    async def create_es_index(self, es_configuration: dict, index_name: str, override=True) -> None:
+        """
+        Create a new index with the specified configuration.
+
+        Args:
+            es_configuration (dict): The configuration for the index, including settings and mappings.
+            index_name (str): The name of the new index.
+        """
+        try:
+            if override:
+                await self.delete_es_index(index_name=index_name)
+
+            await self.conn.indices.create(
+                index=index_name,
+                settings=es_configuration.get("settings", {}),
+                mappings=es_configuration.get("mappings", {})
+            )
+            logger.info(f"New index {index_name} created!")
+        except Exception as e:
+            logger.error(f"An error occurred while creating the index {index_name}: {e}")
+
+    async def delete_es_index(self, index_name: str) -> None:
+        """
+        Delete an index if it exists.
+
+        Args:
+            index_name (str): The name of the index to delete.
+        """
+        try:
+            if await self.conn.indices.exists(index=index_name):
+                logger.info(f"The index {index_name} already exists, going to remove it")
+                await self.conn.indices.delete(index=index_name)
+                logger.info(f"Index {index_name} deleted successfully.")
+            else:
+                logger.info(f"Index {index_name} does not exist.")
+        except NotFoundError:
+            logger.warning(f"Index {index_name} not found. Nothing to delete.")
+        except Exception as e:
+            logger.error(f"An error occurred: {e}")
+
+class AsyncESIndexer(AsyncESConnector):
+
+    def __init__(self, cloud_id: str, credentials: Optional[Tuple[str, str]] = None):
+        super().__init__(cloud_id, credentials)
+
+    async def add_document(self, index_name: str, document: dict[str, Any], doc_id: Optional[str] = None) -> None:
+        """
+        Add a document to an index.
+
+        Args:
+            index_name (str): The name of the index.
+            document (dict): The document to add.
+            doc_id (Optional[str]): The ID of the document. If None, Elasticsearch will generate one.
+        """
+        try:
+            if doc_id:
+                await self.conn.index(index=index_name, id=doc_id, document=document)
+            else:
+                await self.conn.index(index=index_name, document=document)
+            logger.info(f"Document added to {index_name}")
+        except Exception as e:
+            logger.error(f"An error occurred while adding the document to {index_name}: {e}")
+
+    async def delete_document(self, index_name: str, doc_id: str) -> None:
+        """
+        Delete a document from an index.
+
+        Args:
+            index_name (str): The name of the index.
+            doc_id (str): The ID of the document to delete.
+        """
+        try:
+            await self.conn.delete(index=index_name, id=doc_id)
+            logger.info(f"Document with ID {doc_id} deleted from {index_name}")
+        except NotFoundError:
+            logger.warning(f"Document with ID {doc_id} not found in index {index_name}.")
+        except Exception as e:
+            logger.error(f"An error occurred while deleting the document from {index_name}: {e}")
+
+    async def get_document(self, index_name: str, doc_id: str) -> Optional[dict[str, Any]]:
+        """
+        Retrieve a document by its ID from an index.
+
+        Args:
+            index_name (str): The name of the index.
+            doc_id (str): The ID of the document to retrieve.
+
+        Returns:
+            Optional[Dict[str, Any]]: The retrieved document, or None if not found.
+        """
+        try:
+            response = await self.conn.get(index=index_name, id=doc_id)
+            logger.info(f"Document with ID {doc_id} retrieved from {index_name}")
+            return response["_source"]
+        except NotFoundError:
+            logger.warning(f"Document with ID {doc_id} not found in index {index_name}.")
+            return None
+        except Exception as e:
+            logger.error(f"An error occurred while retrieving the document from {index_name}: {e}")
+            return None
+
+    async def update_document(self, index_name: str, doc_id: str, updated_fields: dict[str, Any]) -> None:
+        """
+        Update a document in an index.
+
+        Args:
+            index_name (str): The name of the index.
+            doc_id (str): The ID of the document to update.
+            updated_fields (dict): The fields to update in the document.
+        """
+        try:
+            await self.conn.update(index=index_name, id=doc_id, doc=updated_fields)
+            logger.info(f"Document with ID {doc_id} updated in {index_name}")
+        except NotFoundError:
+            logger.warning(f"Document with ID {doc_id} not found in index {index_name}.")
+        except Exception as e:
+            logger.error(f"An error occurred while updating the document in {index_name}: {e}")
+
+
+class AsyncESBulkIndexer(AsyncESIndexer):
+
+    # Loads in progress per index, shared by every instance (see ESBulkIndexer)
+    _bulk_loads: Dict[str, Dict[str, Any]] = {}
+    _bulk_loads_lock: Optional[asyncio.Lock] = None
+
+    def __init__(self, cloud_id: str, credentials: Optional[Tuple[str, str]] = None):
+        super().__init__(cloud_id, credentials)
+
+    @classmethod
+    def _get_bulk_loads_lock(cls) -> asyncio.Lock:
+        if cls._bulk_loads_lock is None:
+            cls._bulk_loads_lock = asyncio.Lock()
+        return cls._bulk_loads_lock
+
+    async def begin_bulk_load(self, index_name: str) -> None:
+        """
+        Disable refreshes and replicas on an index for a bulk load, remembering the values
+        set on the index (or that none was). Nested or concurrent loads of the same index
+        are reference counted.
+
+        Args:
+            index_name (str): The name of the index.
+        """
+        async with self._get_bulk_loads_lock():
+            load = self._bulk_loads.get(index_name)
+            if load is not None:
+                load["count"] += 1
+                return
+            try:
+                response = await self.conn.indices.get_settings(
+                    index=index_name, name=list(BULK_LOAD_SETTINGS), flat_settings=True
+                )
+                # Settings left at the cluster default are saved as None, which resets them on restore
+                current = response[index_name].get("settings", {})
+                saved = {name: current.get(name) for name in BULK_LOAD_SETTINGS}
+                await self.conn.indices.put_settings(index=index_name, settings=BULK_LOAD_SETTINGS)
+                self._bulk_loads[index_name] = {"count": 1, "saved": saved}
+                logger.info(f"Bulk load started on {index_name}: refresh and replicas disabled")
+            except Exception as e:
+                logger.error(f"An error occurred while preparing {index_name} for bulk loading: {e}")
+
+    async def end_bulk_load(self, index_name: str) -> None:
+        """
+        Restore the refresh interval and replicas saved by begin_bulk_load once the last
+        load of the index ends, and refresh it so the loaded documents become searchable.
+
+        Args:
+            index_name (str): The name of the index.
+        """
+        async with self._get_bulk_loads_lock():
+            load = self._bulk_loads.get(index_name)
+            if load is None:
+                return
+            load["count"] -= 1
+            if load["count"] > 0:
+                return
+            del self._bulk_loads[index_name]
+            try:
+                await self.conn.indices.put_settings(index=index_name, settings=load["saved"])
+                await self.conn.indices.refresh(index=index_name)
+                logger.info(f"Bulk load finished on {index_name}: settings restored to {load['saved']}")
+            except Exception as e:
+                logger.error(f"An error occurred while restoring settings of {index_name} after bulk loading: {e}")
+
+    @asynccontextmanager
+    async def bulk_load(self, index_name: str):
+        """
+        Async context manager running a bulk load with refresh_interval -1 and zero replicas.
+
+        Usage:
+            async with es_bulk_indexer.bulk_load(index_name):
+                await es_bulk_indexer.bulk_upload_documents(index_name, documents, id_col='link')
+        """
+        await self.begin_bulk_load(index_name)
+        try:
+            yield
+        finally:
+            await self.end_bulk_load(index_name)
+
+    def upsert_actions(self, index_name: str, documents: Iterable[dict[str, Any]], id_col: str):
+        """
+        Turn documents into bulk upsert actions lazily, one at a time.
+
+        Args:
+            index_name (str): The name of the index.
+            documents (Iterable[dict[str, Any]]): The documents to upsert.
+            id_col (str): The document field used as the document ID.
+
+        Yields:
+            dict: One update action with doc_as_upsert per document.
+        """
+        for document in documents:
+            yield {
+                "_op_type": "update",
+                "_index": index_name,
+                "_id": document[id_col],
+                "doc": document,
+                "doc_as_upsert": True
+            }
+
+    async def bulk_index(self, actions: Union[Iterable[dict[str, Any]], AsyncIterator[dict[str, Any]]],
+                         chunk_size: int = 500, max_chunk_bytes: int = 10 * 1024 * 1024, max_retries: int = 5,
+                         initial_backoff: float = 2, max_backoff: float = 60) -> Tuple[int, List[dict[str, Any]]]:
+        """
+        Stream bulk actions to Elasticsearch without materializing them.
+
+        Actions are sent in chunks of at most chunk_size actions and max_chunk_bytes bytes.
+        Items rejected with 429 (es_rejected_execution) are retried with exponential backoff,
+        starting at initial_backoff seconds and doubling up to max_backoff, at most
+        max_retries times.
+
+        Args:
+            actions: Any iterable or async iterable of bulk actions.
+            chunk_size (int): The maximum number of actions per bulk request.
+            max_chunk_bytes (int): The maximum size in bytes of a bulk request.
+            max_retries (int): How many times rejected items are retried.
+            initial_backoff (float): Seconds to wait before the first retry.
+            max_backoff (float): The maximum seconds to wait between retries.
+
+        Returns:
+            Tuple[int, List[dict[str, Any]]]: The number of successful actions, and the details
+            (op_type, _index, _id, status, error) of every action that failed for good.
+        """
+        success = 0
+        failures = []
+        results = async_streaming_bulk(
+            self.conn, actions, chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes,
+            raise_on_error=False, raise_on_exception=False, max_retries=max_retries,
+            initial_backoff=initial_backoff, max_backoff=max_backoff
+        )
+        async for ok, item in results:
+            if ok:
+                success += 1
+            else:
+                failures.append(bulk_item_error(item))
+        return success, failures
+
+    async def bulk_upload_documents(self, index_name: str, documents: Iterable[dict[str, Any]], id_col: str,
+                                    chunk_size: int = 500, max_chunk_bytes: int = 10 * 1024 * 1024) -> int:
+        """
+        Bulk upload documents to an Elasticsearch index.
+
+        Args:
+            index_name (str): The name of the index.
+            documents (Iterable[dict[str, Any]]): The documents to upload, as a list or a generator.
+            id_col (str): The document field used as the document ID.
+            chunk_size (int): The maximum number of documents per bulk request.
+            max_chunk_bytes (int): The maximum size in bytes of a bulk request.
+
+        Returns:
+            int: The number of successfully indexed documents.
+        """
+        try:
+            success, failed = await self.bulk_index(
+                self.upsert_actions(index_name, documents, id_col),
+                chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes
+            )
+            logger.info(f"Successfully indexed {success} documents to {index_name}")
+            if failed:
+                logger.warning(f"Failed to index {len(failed)} documents")
+                for failure in failed[:5]:
+                    logger.warning(f"Failed to index {failure['_id']} ({failure['status']}): {failure['error']}")
+            return success
+        except Exception as e:
+            logger.error(f"An error occurred while bulk uploading documents to {index_name}: {e}")
+            return 0
+
+    async def bulk_delete_documents(self, index_name: str, document_ids: Iterable[str]) -> int:
+        """
+        Bulk delete documents from an Elasticsearch index.
+
+        Args:
+            index_name (str): The name of the index.
+            document_ids (Iterable[str]): The document IDs to delete, as a list or a generator.
+
+        Returns:
+            int: The number of successfully deleted documents.
+        """
+        actions = (
+            {
+                "_op_type": "delete",
+                "_index": index_name,
+                "_id": doc_id
+            }
+            for doc_id in document_ids
+        )
+
+        try:
+            success, failed = await self.bulk_index(actions)
+            logger.info(f"Successfully deleted {success} documents from {index_name}")
+            if failed:
+                logger.warning(f"Failed to delete {len(failed)} documents")
+            return success
+        except Exception as e:
+            logger.error(f"An error occurred while bulk deleting documents from {index_name}: {e}")
+            return 0
+
+    async def bulk_reindex(self, source_index: str, target_index: str) -> dict:
+        """
+        Bulk reindex documents from one Elasticsearch index to another.
+
+        Args:
+            source_index (str): The name of the source index.
+            target_index (str): The name of the target index.
+
+        Returns:
+            dict: The response from the reindex operation.
+        """
+        try:
+            response = await self.conn.reindex(
+                source={"index": source_index},
+                dest={"index": target_index},
+                wait_for_completion=True
+            )
+            logger.info(f"Successfully reindexed documents from {source_index} to {target_index}")
+            return response
+        except Exception as e:
+            logger.error(f"An error occurred while reindexing documents: {e}")
+            return {}
+
+class AsyncESQueryMaker(AsyncESConnector):
+
+    def __init__(self, cloud_id: str, credentials: Optional[Tuple[str, str]] = None):
+        super().__init__(cloud_id, credentials)
+
+    def pretty_print_results(self, results: Dict) -> None:
+        """
+        Pretty print the search results.
+
+        Args:
+            results (Dict): The search results to print.
+        """
+        ESQueryMaker.pretty_print_results(self, results)
+
+    async def search_index(self, index_name: str, query: str, fields: List[str]) -> Dict:
+        """
+        Search for a query in a specific index over given fields.
+
+        Args:
+            index_name (str): The name of the index to search.
+            query (str): The query string to search for.
+            fields (List[str]): The list of fields to search over.
+
+        Returns:
+            Dict: The search results.
+        """
+        try:
+            search_body = {
+                "query": {
+                    "multi_match": {
+                        "query": query,
+                        "fields": fields
+                    }
+                }
+            }
+            response = await self.conn.search(index=index_name, body=search_body)
+            logger.info(f"Search executed on index: {index_name} with query: {query}")
+            return response
+        except Exception as e:
+            logger.error(f"Error executing search on index: {index_name} with query: {query}. Error: {e}")
+            raise e
+
+    async def scan_index(self, index_name: str, query: Optional[Dict] = None, source: Optional[List[str]] = None, size: int = 1000):
+        """
+        Iterate over every document in an index matching a query.
+
+        Args:
+            index_name (str): The name of the index to scan.
+            query (Optional[Dict]): The query clause to match. Defaults to match_all.
+            source (Optional[List[str]]): The fields to return. Defaults to the whole document.
+            size (int): The number of documents fetched per request.
+
+        Yields:
+            Dict: The raw hits, with '_id' and '_source'.
+        """
+        body = {"query": query or {"match_all": {}}}
+        if source is not None:
+            body["_source"] = source
+        try:
+            async for hit in async_scan(self.conn, index=index_name, query=body, size=size):
+                yield hit
+        except NotFoundError:
+            logger.warning(f"Index {index_name} not found.")
+
+    async def get_documents(self, index_name: str, doc_ids: List[str], source: Optional[List[str]] = None, chunk_size: int = 1000) -> Dict[str, Dict]:
+        """
+        Look up many documents by ID with multi-get requests.
+
+        Args:
+            index_name (str): The name of the index.
+            doc_ids (List[str]): The IDs of the documents to look up.
+            source (Optional[List[str]]): The fields to return. Defaults to the whole document.
+            chunk_size (int): The maximum number of IDs per request.
+
+        Returns:
+            Dict[str, Dict]: The source of each document found, keyed by ID. Missing IDs are left out.
+        """
+        found = {}
+        doc_ids = list(dict.fromkeys(doc_ids))
+        try:
+            for start in range(0, len(doc_ids), chunk_size):
+                response = await self.conn.mget(index=index_name, ids=doc_ids[start:start + chunk_size], source=source)
+                for doc in response["docs"]:
+                    if doc.get("found"):
+                        found[doc["_id"]] = doc.get("_source", {})
+        except NotFoundError:
+            logger.warning(f"Index {index_name} not found.")
+        return found
+
+    async def open_point_in_time(self, index_name: str, keep_alive: str = "10m") -> str:
+        """
+        Open a point in time (PIT) on an index, a consistent view for paging with search_after.
+
+        Args:
+            index_name (str): The name of the index.
+            keep_alive (str): How long the PIT lives without being used, e.g. "10m".
+
+        Returns:
+            str: The PIT ID.
+        """
+        response = await self.conn.open_point_in_time(index=index_name, keep_alive=keep_alive)
+        return response["id"]
+
+    async def close_point_in_time(self, pit_id: str) -> None:
+        try:
+            await self.conn.close_point_in_time(id=pit_id)
+        except NotFoundError:
+            logger.warning("Point in time already expired.")
+        except Exception as e:
+            logger.error(f"An error occurred while closing a point in time: {e}")
+
+    async def iter_document_pages(self, index_name: str, query: Optional[Dict] = None, source_includes: Optional[List[str]] = None,
+                                  source_excludes: Optional[List[str]] = None, page_size: int = 1000, keep_alive: str = "10m",
+                                  pit_id: Optional[str] = None, slice_id: Optional[int] = None,
+                                  max_slices: Optional[int] = None, fetch_source: bool = True) -> AsyncIterator[List[Dict]]:
+        """
+        Page through every document matching a query with a point in time and search_after.
+        See ESQueryMaker.iter_document_pages; with max_slices > 1, run one task per
+        slice_id over a shared pit_id to drain an index in parallel.
+
+        Yields:
+            List[Dict]: Pages of raw hits, with '_id' and '_source'.
+        """
+        own_pit = pit_id is None
+        if own_pit:
+            pit_id = await self.open_point_in_time(index_name, keep_alive)
+
+        body = {
+            "query": query or {"match_all": {}},
+            "size": page_size,
+            "sort": [{"_shard_doc": "asc"}]
+        }
+        if not fetch_source:
+            body["_source"] = False
+        elif source_includes or source_excludes:
+            body["_source"] = {"includes": source_includes or [], "excludes": source_excludes or []}
+        if max_slices and max_slices > 1:
+            body["slice"] = {"id": slice_id, "max": max_slices}
+
+        try:
+            while True:
+                body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+                response = await self.conn.search(body=body)
+                pit_id = response.get("pit_id", pit_id)
+                hits = response["hits"]["hits"]
+                if not hits:
+                    break
+                yield hits
+                if len(hits) < page_size:
+                    break
+                body["search_after"] = hits[-1]["sort"]
+        finally:
+            if own_pit:
+                await self.close_point_in_time(pit_id)
+
+    async def iter_documents(self, index_name: str, query: Optional[Dict] = None, source_includes: Optional[List[str]] = None,
+                             source_excludes: Optional[List[str]] = None, page_size: int = 1000, keep_alive: str = "10m",
+                             pit_id: Optional[str] = None, slice_id: Optional[int] = None,
+                             max_slices: Optional[int] = None, fetch_source: bool = True) -> AsyncIterator[Dict]:
+        """
+        Iterate over every document matching a query, one hit at a time. Takes the same
+        arguments as iter_document_pages.
+
+        Yields:
+            Dict: The raw hits, with '_id' and '_source'.
+        """
+        async for page in self.iter_document_pages(index_name, query, source_includes, source_excludes, page_size,
+                                                   keep_alive, pit_id, slice_id, max_slices, fetch_source):
+            for hit in page:
+                yield hit
+
+    async def get_ids(self, index_name: str, query: Optional[Dict] = None, page_size: int = 10000) -> set:
+        """
+        Collect the IDs of every document matching a query, without fetching any source.
+
+        Args:
+            index_name (str): The name of the index.
+            query (Optional[Dict]): The query clause to match. Defaults to match_all.
+            page_size (int): The number of IDs fetched per request.
+
+        Returns:
+            set: The document IDs.
+        """
+        return {hit["_id"] async for hit in self.iter_documents(index_name, query, page_size=page_size, fetch_source=False)}
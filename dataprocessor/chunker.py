@@ -0,0 +1,104 @@
+import os
+import re
+import sys
+import logging
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+from rate_limiter import CHARS_PER_TOKEN, estimate_tokens
+sys.path.pop(0)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+# Boundaries tried in order when a span is over budget: paragraphs, lines, then sentences
+BOUNDARIES = [
+    re.compile(r'\n\s*\n'),
+    re.compile(r'\n'),
+    re.compile(r'(?<=[.!?])\s+'),
+]
+
+
+def split_at(text, start, end, pattern):
+    '''Cut text[start:end] after every match of pattern, into contiguous (start, end) spans.'''
+    spans = []
+    for match in pattern.finditer(text, start, end):
+        if match.end() > start and match.end() < end:
+            spans.append((start, match.end()))
+            start = match.end()
+    spans.append((start, end))
+    return spans
+
+
+def hard_split(text, start, end, max_chars):
+    '''Cut a span with no usable boundary into max_chars pieces, preferring to cut at whitespace.'''
+    spans = []
+    while end - start > max_chars:
+        cut = text.rfind(' ', start + 1, start + max_chars)
+        cut = cut + 1 if cut > start else start + max_chars
+        spans.append((start, cut))
+        start = cut
+    spans.append((start, end))
+    return spans
+
+
+def segment(text, start, end, max_chars, level=0):
+    '''Split text[start:end] into contiguous spans of at most max_chars, on the coarsest boundary that fits.'''
+    if end - start <= max_chars:
+        return [(start, end)]
+    if level == len(BOUNDARIES):
+        return hard_split(text, start, end, max_chars)
+    spans = []
+    for span_start, span_end in split_at(text, start, end, BOUNDARIES[level]):
+        spans.extend(segment(text, span_start, span_end, max_chars, level + 1))
+    return spans
+
+
+def chunk_text(text, max_tokens=3000, overlap_tokens=200):
+    '''
+    Split text into chunks of at most max_tokens (estimated), packing whole paragraphs,
+    lines or sentences and only cutting mid-sentence when a single sentence is over budget.
+
+    Chunks are contiguous and cover the whole text, so their cleaned versions can be joined
+    back in order. Each chunk also names up to overlap_tokens of the text before it
+    (context_start to start) to show the LLM as context without cleaning it twice.
+
+    Returns a list of dicts with start, end and context_start offsets into text, and tokens.
+    '''
+    if not text:
+        return []
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+    units = segment(text, 0, len(text), max_chars)
+
+    chunks = []
+    i = 0
+    while i < len(units):
+        start = units[i][0]
+        j = i + 1
+        while j < len(units) and units[j][1] - start <= max_chars:
+            j += 1
+        end = units[j - 1][1]
+
+        # Whole units before the chunk that fit in the overlap, else the tail of the previous one
+        k = i
+        while k > 0 and start - units[k - 1][0] <= overlap_chars:
+            k -= 1
+        if k < i:
+            context_start = units[k][0]
+        elif chunks:
+            context_start = max(chunks[-1]['start'], start - overlap_chars)
+        else:
+            context_start = start
+
+        chunks.append({
+            'start': start,
+            'end': end,
+            'context_start': context_start,
+            'tokens': estimate_tokens(text[start:end]),
+        })
+        i = j
+    return chunks
@@ -1,17 +1,18 @@
 import os
+import sys
+import asyncio
 import logging
-import os
-from openai import AzureOpenAI
-from prompts import CLEAN_TEXT_PROMPT, EXTRACT_ENTITIES_PROMPT, EXTRACT_RELATIONSHIPS_PROMPT
+from prompts import CLEAN_TEXT_PROMPT, CLEAN_TEXT_CHUNK_PROMPT, EXTRACT_ENTITIES_PROMPT, EXTRACT_RELATIONSHIPS_PROMPT
+from chunker import chunk_text
+from llm_cache import LLMCacheMiss
 from dotenv import load_dotenv
 load_dotenv()
 
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_KEY_1"),  
-    api_version="2024-06-01",
-    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    )
-    
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+from llm_client import AsyncLLMClient
+sys.path.pop(0)
+
 AZURE_OPENAI_DEPLOYMENT_NAME=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
 # Set up logging
 logging.basicConfig(level=logging.INFO,
@@ -20,30 +21,37 @@ logging.basicConfig(level=logging.INFO,
 logger = logging.getLogger(__name__)
 
 class LLMProcessor:
-    def __init__(self, api_key=None, model="gpt-4o"):
+    def __init__(self, api_key=None, model="gpt-4o", rate_limiter=None, max_retries=5, timeout=None,
+                 cache=None, cache_only=False):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.model = model
-        self.client = AzureOpenAI(
-                            api_key=os.getenv("AZURE_OPENAI_KEY_1"),  
-                            api_version="2024-06-01",
-                            azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+        # Optional LLMCache; with cache_only, uncached requests raise LLMCacheMiss instead of calling the LLM
+        self.cache = cache
+        self.cache_only = cache_only
+        # Awaits the shared async client, so concurrent workers overlap without threads
+        self.client = AsyncLLMClient(
+                            deployment=AZURE_OPENAI_DEPLOYMENT_NAME,
+                            rate_limiter=rate_limiter,
+                            max_retries=max_retries,
+                            timeout=timeout
                             )
         self.logger = logging.getLogger(__name__)
         self.logger.info(f"LLMProcessor initialized with model: {self.model}")
 
+    @property
+    def rate_limiter(self):
+        return self.client.rate_limiter
+
+    @rate_limiter.setter
+    def rate_limiter(self, rate_limiter):
+        self.client.rate_limiter = rate_limiter
+
     async def _process_request(self, system_prompt, user_prompt):
         self.logger.info(f"Processing request with model: {self.model}")
         try:
-            response = self.client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT_NAME,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=4096
-            )
+            result = await self.client.complete(system_prompt, user_prompt)
             self.logger.info("Request processed successfully")
-            return response.choices[0].message.content.strip()
+            return result
         except Exception as e:
             self.logger.error(f"Error processing request: {str(e)}")
             raise
@@ -51,16 +59,73 @@ class LLMProcessor:
     async def _execute_task(self, task_name, prompt, prompt_template):
         self.logger.info(f"Executing task: {task_name}")
         try:
+            cache_key = None
+            if self.cache:
+                cache_key = self.cache.make_key(prompt_template, prompt, self.client.deployment,
+                                                {'max_tokens': self.client.max_tokens})
+                cached = await asyncio.to_thread(self.cache.get, cache_key)
+                if cached is not None:
+                    self.logger.info(f"{task_name.capitalize()} served from cache")
+                    return cached
+            if self.cache_only:
+                raise LLMCacheMiss(f"No cached result for {task_name}")
+
             result = await self._process_request(prompt_template, prompt)
+            if self.cache:
+                await asyncio.to_thread(self.cache.put, cache_key, result)
             self.logger.info(f"{task_name.capitalize()} completed successfully")
             return result
+        except LLMCacheMiss:
+            raise
         except Exception as e:
             self.logger.error(f"Error in {task_name}: {str(e)}")
             raise
 
-    async def clean_text(self, text):
+    async def clean_text(self, text, context=None):
+        if context:
+            prompt = f"Preceding text:\n{context}\n\nText to clean:\n{text}"
+            return await self._execute_task("cleaning text chunk", prompt, CLEAN_TEXT_CHUNK_PROMPT)
         return await self._execute_task("cleaning text", text, CLEAN_TEXT_PROMPT)
 
+    async def clean_long_text(self, text, max_chunk_tokens=3000, overlap_tokens=200):
+        '''
+        Clean text of any length: split it into chunks on paragraph and sentence boundaries,
+        clean the chunks concurrently (each with the text before it as context) and join the
+        results in order. Text that fits in one chunk is cleaned in a single request.
+
+        Returns the cleaned text and the chunk boundaries, as source_start/source_end offsets
+        into text and cleaned_start/cleaned_end offsets into the cleaned text.
+        '''
+        chunks = chunk_text(text, max_chunk_tokens, overlap_tokens)
+        if len(chunks) > 1:
+            self.logger.info(f"Cleaning text in {len(chunks)} chunks")
+
+        async def clean_chunk(chunk):
+            part = text[chunk['start']:chunk['end']]
+            if not part.strip():
+                return ''
+            return await self.clean_text(part, context=text[chunk['context_start']:chunk['start']])
+
+        results = await asyncio.gather(*(clean_chunk(chunk) for chunk in chunks))
+
+        parts = []
+        boundaries = []
+        offset = 0
+        for chunk, cleaned in zip(chunks, results):
+            if parts and cleaned:
+                offset += 2
+            boundaries.append({
+                'source_start': chunk['start'],
+                'source_end': chunk['end'],
+                'cleaned_start': offset,
+                'cleaned_end': offset + len(cleaned),
+                'tokens': chunk['tokens'],
+            })
+            if cleaned:
+                parts.append(cleaned)
+                offset += len(cleaned)
+        return '\n\n'.join(parts), boundaries
+
     async def extract_entities(self, text, existing_entities=None):
         prompt = text
         if existing_entities:
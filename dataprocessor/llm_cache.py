@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import sqlite3
+import logging
+import threading
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+
+class LLMCacheMiss(Exception):
+    '''Raised in cache-only mode for a request whose result is not cached.'''
+
+
+class LLMCache:
+    '''
+    Persistent cache of LLM results, addressed by content: the key is a hash of the
+    system prompt, the input text, the deployment and the generation parameters, so
+    identical text scraped under different URLs or processed into another index is
+    served from the cache, while a changed prompt or deployment misses.
+
+    Results are stored zlib-compressed in a SQLite file. The total stored size is kept
+    under max_bytes by evicting least recently used entries. Hit and miss counts are
+    kept for the lifetime of the instance.
+    '''
+    def __init__(self, cache_dir, max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'llm_cache.db'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                result BLOB,
+                size INTEGER,
+                created_at REAL,
+                last_access REAL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(system_prompt, user_prompt, deployment, params):
+        payload = json.dumps({
+            'system': system_prompt,
+            'user': user_prompt,
+            'deployment': deployment,
+            'params': params,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute('SELECT result FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, key, result):
+        compressed = zlib.compress(result.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO entries (key, result, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)',
+                (key, compressed, len(compressed), now, now)
+            )
+            self.conn.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self.conn.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+        self.conn.commit()
+        self.logger.info(f"Evicted {evicted} entries from LLM cache")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
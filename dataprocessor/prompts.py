@@ -19,6 +19,13 @@ Your output should be a clean, readable version of the original text, faithfully
 Please process the following webscraped text according to these guidelines:
 '''
 
+CLEAN_TEXT_CHUNK_PROMPT = CLEAN_TEXT_PROMPT + '''
+The text is one chunk of a longer document that is cleaned in parts and joined back together afterwards:
+- It may begin or end in the middle of a sentence. Leave the boundaries as they are and do not complete them.
+- Text under "Preceding text:" is only there for context; it is cleaned as part of the previous chunk. Do not include it in your output.
+- Output only the cleaned version of the text under "Text to clean:".
+'''
+
 EXTRACT_ENTITIES_PROMPT = '''
 Your task is to perform comprehensive Named Entity Recognition (NER) on the given text. Follow these guidelines:
 
@@ -6,12 +6,16 @@ import asyncio
 import argparse
 from dotenv import load_dotenv
 from llm import LLMProcessor
+from llm_cache import LLMCache, LLMCacheMiss
 from tqdm import tqdm
 
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, parent_dir)
-from elastic_helpers import ESBulkIndexer, ESQueryMaker
-from elastic_config import BASIC_CONFIG
+from elastic_helpers import configure_es_connections
+from async_elastic_helpers import AsyncESBulkIndexer, AsyncESQueryMaker
+from elastic_config import PROCESSED_CONFIG
+from llm_client import configure_llm_client, close_llm_clients
+from rate_limiter import RateLimiter
 sys.path.pop(0)
 
 load_dotenv()
@@ -31,16 +35,30 @@ ELASTIC_CLOUD_ID = os.environ.get('ELASTIC_CLOUD_ID')
 ELASTIC_USERNAME = os.environ.get('ELASTIC_USERNAME')
 ELASTIC_PASSWORD = os.environ.get('ELASTIC_PASSWORD')
 ELASTIC_CLOUD_AUTH = (ELASTIC_USERNAME, ELASTIC_PASSWORD)
-es_bulk_indexer = ESBulkIndexer(cloud_id=ELASTIC_CLOUD_ID, credentials=ELASTIC_CLOUD_AUTH)
-es_query_maker = ESQueryMaker(cloud_id=ELASTIC_CLOUD_ID, credentials=ELASTIC_CLOUD_AUTH)
+es_bulk_indexer = AsyncESBulkIndexer(cloud_id=ELASTIC_CLOUD_ID, credentials=ELASTIC_CLOUD_AUTH)
+es_query_maker = AsyncESQueryMaker(cloud_id=ELASTIC_CLOUD_ID, credentials=ELASTIC_CLOUD_AUTH)
 
-async def process_document(doc, text_field):
+# Scraped text fields that are replaced by cleaned_text in the processed document
+RAW_TEXT_FIELDS = ['all_text', 'main_text']
+
+async def process_document(doc, text_field, fallback_text_field=None, chunk_tokens=3000, chunk_overlap_tokens=200):
     try:
         logger.info(f"Processing document: {doc['_id']}")
         
-        # Clean text
-        cleaned_text = await llm.clean_text(doc['_source'][text_field])
-        await asyncio.sleep(1)  # 1 second delay
+        # Documents scraped without main-content extraction (or PDFs) only carry the full text
+        source_field = text_field
+        text = doc['_source'].get(text_field)
+        if not text and fallback_text_field:
+            source_field = fallback_text_field
+            text = doc['_source'].get(fallback_text_field)
+        if not text:
+            logger.warning(f"Document {doc['_id']} has no text to clean")
+            return None
+        if 'main_text_ratio' in doc['_source']:
+            logger.info(f"Main content is {doc['_source']['main_text_ratio']:.0%} of the page text")
+
+        # Clean text; long documents are cleaned in concurrent chunks and joined back in order
+        cleaned_text, chunks = await llm.clean_long_text(text, chunk_tokens, chunk_overlap_tokens)
 
         # # Extract entities
         # entities = await llm.extract_entities(cleaned_text)
@@ -50,87 +68,181 @@ async def process_document(doc, text_field):
         # relationships = await llm.extract_relationships(cleaned_text, entities)
 
         # Prepare processed document
-        processed_doc = {k: v for k, v in doc['_source'].items() if k not in ['links', text_field]}
+        processed_doc = {k: v for k, v in doc['_source'].items() if k not in ['links', text_field] + RAW_TEXT_FIELDS}
         processed_doc.update({
             'cleaned_text': cleaned_text,
+            'cleaned_from': source_field,
+            'chunks': chunks,
             # 'entities': entities,
             # 'relationships': relationships
         })
 
         return processed_doc
+    except LLMCacheMiss:
+        logger.info(f"Skipping document {doc['_id']}: no cached LLM result in cache-only mode")
+        return None
     except Exception as e:
         logger.error(f"Error processing document {doc['_id']}: {str(e)}")
         logger.debug(traceback.format_exc())
         return None
 
-async def run(raw_index_name, text_field, processed_index_name):
+async def run(raw_index_name, text_field, processed_index_name, fallback_text_field=None, page_size=100, slices=1,
+              concurrency=4, bulk_size=20, chunk_tokens=3000, chunk_overlap_tokens=200):
     try:
         # Check if processed index exists, create if not
-        if not es_bulk_indexer.check_index_existence(index_name=processed_index_name):
+        if not await es_bulk_indexer.check_index_existence(index_name=processed_index_name):
             logger.info(f"Creating new index: {processed_index_name}")
-            es_bulk_indexer.create_es_index(es_configuration=BASIC_CONFIG, index_name=processed_index_name)
-
-        # Query all documents from raw index
-        query = {"query": {"match_all": {}}}
-        raw_docs = es_query_maker.conn.search(index=raw_index_name, body=query, scroll='2m', size=1000)
-        scroll_id = raw_docs['_scroll_id']
-        total_docs = raw_docs['hits']['total']['value']
-
-        with tqdm(total=total_docs, desc="Processing documents") as pbar:
-            while len(raw_docs['hits']['hits']) > 0:
-                for doc in raw_docs['hits']['hits']:
-                    try:
-                        # Check if document already exists in processed index
-                        exists_query = {"query": {"term": {"_id": doc['_id']}}}
-                        exists_result = es_query_maker.conn.search(index=processed_index_name, body=exists_query)
-                        
-                        if exists_result['hits']['total']['value'] > 0:
-                            logger.info(f"Document {doc['_id']} already processed. Skipping.")
-                            pbar.update(1)
-                            continue
-                        
-                        processed_doc = await process_document(doc, text_field)
-                        
-                        if processed_doc:
-                            # Index single processed document
-                            success = es_bulk_indexer.bulk_upload_documents(
-                                index_name=processed_index_name,
-                                documents=[processed_doc],
-                                id_col='link'
-                            )
-                            if success:
-                                logger.info(f"Indexed processed document: {processed_doc['link']}")
-                            else:
-                                logger.warning(f"Failed to index processed document: {processed_doc['link']}")
-                        else:
-                            logger.warning(f"Failed to process document: {doc['_id']}")
-                    except Exception as e:
-                        logger.error(f"Error processing or indexing document {doc['_id']}: {str(e)}")
-                        logger.debug(traceback.format_exc())
-                    finally:
-                        pbar.update(1)
-
-                # Get next batch
-                raw_docs = es_query_maker.conn.scroll(scroll_id=scroll_id, scroll='2m')
+            await es_bulk_indexer.create_es_index(es_configuration=PROCESSED_CONFIG, index_name=processed_index_name)
+
+        # Query all documents from raw index, leaving out near-duplicates flagged by the scraper
+        query = {"bool": {"must_not": {"exists": {"field": "duplicate_of"}}}}
+        total_docs = (await es_query_maker.conn.count(index=raw_index_name, query=query))['count']
+
+        # Documents already in the processed index are diffed out locally, page by page
+        processed_ids = await es_query_maker.get_ids(processed_index_name)
+        logger.info(f"{len(processed_ids)} documents already processed")
+
+        # A point in time stays valid however long a page takes to clean, unlike a scroll
+        pit_id = await es_query_maker.open_point_in_time(raw_index_name)
+
+        # Pages feed a bounded queue drained by concurrent LLM workers; the rate limiter
+        # inside llm keeps them within the deployment's quota
+        queue = asyncio.Queue(maxsize=concurrency * 2)
+        pending = []
+
+        async def flush():
+            batch = pending[:]
+            pending.clear()
+            if not batch:
+                return
+            success = await es_bulk_indexer.bulk_upload_documents(
+                index_name=processed_index_name,
+                documents=batch,
+                id_col='link'
+            )
+            if success == len(batch):
+                logger.info(f"Indexed {success} processed documents")
+            else:
+                logger.warning(f"Indexed {success} of {len(batch)} processed documents")
+
+        async def worker():
+            while True:
+                doc = await queue.get()
+                if doc is None:
+                    return
+                try:
+                    processed_doc = await process_document(doc, text_field, fallback_text_field, chunk_tokens, chunk_overlap_tokens)
+                    if processed_doc:
+                        pending.append(processed_doc)
+                        if len(pending) >= bulk_size:
+                            await flush()
+                    else:
+                        logger.warning(f"Failed to process document: {doc['_id']}")
+                except Exception as e:
+                    logger.error(f"Error processing or indexing document {doc['_id']}: {str(e)}")
+                    logger.debug(traceback.format_exc())
+                finally:
+                    pbar.update(1)
+
+        async def drain(slice_id):
+            pages = es_query_maker.iter_document_pages(
+                raw_index_name,
+                query=query,
+                source_excludes=['links'],
+                page_size=page_size,
+                pit_id=pit_id,
+                slice_id=slice_id,
+                max_slices=slices
+            )
+            async for page in pages:
+                todo = [doc for doc in page if doc['_id'] not in processed_ids]
+                if len(todo) < len(page):
+                    logger.info(f"{len(page) - len(todo)} of {len(page)} documents in page already processed. Skipping.")
+                    pbar.update(len(page) - len(todo))
+                for doc in todo:
+                    await queue.put(doc)
+
+        workers = []
+        try:
+            with tqdm(total=total_docs, desc="Processing documents") as pbar:
+                workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+                # Each slice is read by its own task
+                await asyncio.gather(*(drain(slice_id) for slice_id in range(slices)))
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            # Whatever was cleaned before a failure is still indexed
+            await flush()
+            await es_query_maker.close_point_in_time(pit_id)
 
         logger.info(f"All documents processed. Total: {total_docs}")
 
     except Exception as e:
         logger.error(f"An error occurred during the run: {str(e)}")
         logger.debug(traceback.format_exc())
+    finally:
+        await es_bulk_indexer.close()
+        await es_query_maker.close()
+        await close_llm_clients()
+        if llm.cache:
+            stats = llm.cache.stats()
+            logger.info(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+                        f"({stats['hit_rate']:.0%}); {stats['hits']} LLM calls saved")
 
 def main():
     parser = argparse.ArgumentParser(description="Process and index text content using LLM.")
     parser.add_argument("raw_index_name", help="Index to draw from")
     parser.add_argument("text_field", help="Text data field to process")
     parser.add_argument("processed_index_name", help="Index to upload to")
+    parser.add_argument("--fallback-text-field", default=None, help="Field to clean when text_field is missing, e.g. all_text when cleaning main_text")
+    parser.add_argument("--page-size", type=int, default=100, help="Raw documents fetched per page (default: 100)")
+    parser.add_argument("--slices", type=int, default=1, help="Split the raw index into this many slices processed in parallel (default: 1)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Documents cleaned by the LLM at the same time (default: 4)")
+    parser.add_argument("--requests-per-minute", type=int, default=60, help="LLM requests per minute allowed by the deployment (default: 60)")
+    parser.add_argument("--tokens-per-minute", type=int, default=80000, help="LLM tokens per minute allowed by the deployment, counting max_tokens of each completion (default: 80000)")
+    parser.add_argument("--llm-timeout", type=float, default=120, help="Seconds before an LLM request times out and is retried (default: 120)")
+    parser.add_argument("--llm-max-connections", type=int, default=100, help="Pooled connections to the LLM endpoint (default: 100)")
+    parser.add_argument("--chunk-tokens", type=int, default=3000, help="Longest text cleaned in one LLM request; longer documents are split into chunks cleaned in parallel (default: 3000)")
+    parser.add_argument("--chunk-overlap-tokens", type=int, default=200, help="Preceding text shown to the LLM as context with each chunk (default: 200)")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the LLM instead of using the local result cache")
+    parser.add_argument("--llm-cache-dir", default=os.path.join(parent_dir, '.cache', 'llm'), help="Directory of the local LLM result cache")
+    parser.add_argument("--llm-cache-max-mb", type=int, default=1024, help="Maximum size of the local LLM result cache in MB (default: 1024)")
+    parser.add_argument("--cache-only", action="store_true", help="Dry run against the LLM cache: never call the LLM, index only documents with a cached result and skip the rest")
+    parser.add_argument("--bulk-size", type=int, default=20, help="Processed documents per bulk write (default: 20)")
+    parser.add_argument("--es-connections-per-node", type=int, default=10, help="Pooled Elasticsearch connections per node (default: 10)")
+    parser.add_argument("--es-request-timeout", type=float, default=30, help="Seconds before an Elasticsearch request times out (default: 30)")
+    parser.add_argument("--es-no-compress", action="store_true", help="Send Elasticsearch request bodies uncompressed")
     args = parser.parse_args()
 
+    configure_es_connections(
+        connections_per_node=args.es_connections_per_node,
+        request_timeout=args.es_request_timeout,
+        http_compress=not args.es_no_compress
+    )
+    configure_llm_client(timeout=args.llm_timeout, max_connections=args.llm_max_connections)
+    llm.rate_limiter = RateLimiter(requests_per_minute=args.requests_per_minute, tokens_per_minute=args.tokens_per_minute)
+
+    if args.chunk_tokens > llm.client.max_tokens:
+        parser.error(f"--chunk-tokens must not exceed the {llm.client.max_tokens} completion tokens of a request")
+    if args.cache_only and args.no_llm_cache:
+        parser.error("--cache-only needs the LLM cache")
+    if not args.no_llm_cache:
+        llm.cache = LLMCache(cache_dir=args.llm_cache_dir, max_bytes=args.llm_cache_max_mb * 1024 * 1024)
+        llm.cache_only = args.cache_only
+
     try:
-        asyncio.run(run(args.raw_index_name, args.text_field, args.processed_index_name))
+        asyncio.run(run(args.raw_index_name, args.text_field, args.processed_index_name, args.fallback_text_field,
+                        args.page_size, args.slices, args.concurrency, args.bulk_size, args.chunk_tokens,
+                        args.chunk_overlap_tokens))
     except Exception as e:
         logger.error(f"An error occurred in main: {str(e)}")
         logger.debug(traceback.format_exc())
+    finally:
+        if llm.cache:
+            llm.cache.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
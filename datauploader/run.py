@@ -11,7 +11,7 @@ from llama_index.core import SimpleDirectoryReader
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, parent_dir)
 from elastic_helpers import ESBulkIndexer
-from elastic_config import BASIC_CONFIG
+from elastic_config import RAG_CONFIG
 
 sys.path.pop(0)
 
@@ -45,14 +45,15 @@ async def upload_documents(documents, index_name):
         # Check if index exists, create if not
         if not es_bulk_indexer.check_index_existence(index_name=index_name):
             logger.info(f"Creating new index: {index_name}")
-            es_bulk_indexer.create_es_index(es_configuration=BASIC_CONFIG, index_name=index_name)
-
-        # Bulk upload documents
-        success = es_bulk_indexer.bulk_upload_documents(
-            index_name=index_name,
-            documents=documents,
-            id_col='filename'
-        )
+            es_bulk_indexer.create_es_index(es_configuration=RAG_CONFIG, index_name=index_name)
+
+        # Bulk upload documents with refreshes and replicas off until the load is done
+        with es_bulk_indexer.bulk_load(index_name):
+            success = es_bulk_indexer.bulk_upload_documents(
+                index_name=index_name,
+                documents=documents,
+                id_col='filename'
+            )
 
         if success:
             logger.info(f"Successfully uploaded {len(documents)} documents to index: {index_name}")
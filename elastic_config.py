@@ -7,4 +7,73 @@ BASIC_CONFIG = {
     "mappings": {
         "dynamic": True
     }
-}
\ No newline at end of file
+}
+
+# Settings shared by the tuned profiles below. best_compression trades a little CPU on
+# merges for noticeably smaller stored fields, which dominate these text-heavy indexes.
+# Replicas stay at 0 as in BASIC_CONFIG; add them on the index once loading is done.
+TUNED_SETTINGS = {
+    "number_of_shards": 1,
+    "number_of_replicas": 0,
+    "max_result_window": 10000,
+    "codec": "best_compression"
+}
+
+# Fields of a Google Custom Search result as scraped into raw__{entity}. Unmapped fields
+# (e.g. pagemap) are kept in _source but not indexed, since the mappings are not dynamic.
+SEARCH_RESULT_PROPERTIES = {
+    "link": {"type": "keyword"},
+    "displayLink": {"type": "keyword"},
+    "title": {"type": "text"},
+    "snippet": {"type": "text"},
+    "content_type": {"type": "keyword"},
+    "page_count": {"type": "integer"},
+    "pages_extracted": {"type": "integer"},
+    "crawl_depth": {"type": "integer"},
+    "fetched_at": {"type": "date"},
+    "simhash": {"type": "keyword"},
+    "duplicate_of": {"type": "keyword"},
+    "main_text_ratio": {"type": "float"}
+}
+
+# Scraped pages: full text plus the outgoing links, which are stored but never searched
+RAW_CONFIG = {
+    "settings": TUNED_SETTINGS,
+    "mappings": {
+        "dynamic": False,
+        "properties": {
+            **SEARCH_RESULT_PROPERTIES,
+            "all_text": {"type": "text"},
+            "main_text": {"type": "text"},
+            "links": {"type": "object", "enabled": False},
+            "pagemap": {"type": "object", "enabled": False}
+        }
+    }
+}
+
+# LLM-cleaned documents produced by the dataprocessor
+PROCESSED_CONFIG = {
+    "settings": TUNED_SETTINGS,
+    "mappings": {
+        "dynamic": False,
+        "properties": {
+            **SEARCH_RESULT_PROPERTIES,
+            "cleaned_text": {"type": "text"},
+            "cleaned_from": {"type": "keyword"},
+            "chunks": {"type": "object", "enabled": False},
+            "pagemap": {"type": "object", "enabled": False}
+        }
+    }
+}
+
+# Local files uploaded for RAG by the datauploader
+RAG_CONFIG = {
+    "settings": TUNED_SETTINGS,
+    "mappings": {
+        "dynamic": False,
+        "properties": {
+            "filename": {"type": "keyword"},
+            "text": {"type": "text"}
+        }
+    }
+}
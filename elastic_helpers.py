@@ -1,43 +1,152 @@
+import time
 import logging
-from typing import Optional, Tuple, List, Dict, Any
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Tuple, List, Dict, Any, Iterable, Iterator
 from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import NotFoundError
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import scan, streaming_bulk, parallel_bulk
 import json
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def bulk_item_status(item: dict[str, Any]) -> Optional[int]:
+    """
+    Get the HTTP status of one item of a bulk response.
+
+    Args:
+        item (dict[str, Any]): A bulk response item, keyed by its operation type.
+
+    Returns:
+        Optional[int]: The status code, or None if the item has none.
+    """
+    return next(iter(item.values()), {}).get("status")
+
+
+def bulk_item_error(item: dict[str, Any]) -> dict[str, Any]:
+    """
+    Flatten a failed item of a bulk response.
+
+    Args:
+        item (dict[str, Any]): A bulk response item, keyed by its operation type.
+
+    Returns:
+        dict: The op_type, _index, _id, status and error of the item.
+    """
+    op_type, details = next(iter(item.items()))
+    return {
+        "op_type": op_type,
+        "_index": details.get("_index"),
+        "_id": details.get("_id"),
+        "status": details.get("status"),
+        "error": details.get("error") or details.get("exception")
+    }
+
+
+# Client options applied to every connection the registry creates
+CONNECTION_OPTIONS = {
+    "connections_per_node": 10,
+    "http_compress": True,
+    "request_timeout": 30,
+    "max_retries": 3,
+    "retry_on_timeout": True,
+}
+
+# One client (and connection pool) per cluster, credentials and client class in the process
+_connections: Dict[tuple, Any] = {}
+_connections_lock = threading.Lock()
+
+
+def configure_es_connections(**options: Any) -> None:
+    """
+    Change the client options used by the connection registry. Only connections created
+    afterwards are affected, so call this before the first request.
+
+    Args:
+        **options: Any of the CONNECTION_OPTIONS keys, e.g. connections_per_node (pool size
+            per node; pooled connections are kept alive between requests), http_compress
+            (gzip request bodies) or request_timeout. Sniffing is not offered: every
+            helper connects with cloud_id, which the client refuses to sniff.
+    """
+    unknown = set(options) - set(CONNECTION_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown connection options: {', '.join(sorted(unknown))}")
+    CONNECTION_OPTIONS.update(options)
+
+
+def get_es_connection(cloud_id: str, credentials: Optional[Tuple[str, str]], client_class: type = Elasticsearch) -> Any:
+    """
+    Get the process-wide client for a cluster, creating it on first use. Every helper
+    instance with the same cloud_id and credentials shares the client and its pool.
+    Creation happens under a lock and never awaits, so it is safe from threads and tasks.
+
+    Args:
+        cloud_id (str): The cloud ID of the Elasticsearch deployment.
+        credentials (Optional[Tuple[str, str]]): A tuple containing the username and password.
+        client_class (type): Elasticsearch or AsyncElasticsearch.
+
+    Returns:
+        The shared client instance.
+    """
+    key = (cloud_id, tuple(credentials) if credentials else None, client_class)
+    with _connections_lock:
+        conn = _connections.get(key)
+        if conn is None:
+            auth = {"basic_auth": tuple(credentials)} if credentials else {}
+            conn = client_class(cloud_id=cloud_id, **auth, **CONNECTION_OPTIONS)
+            _connections[key] = conn
+            logger.info(f"{client_class.__name__} connection created for cloud_id: {cloud_id}")
+        return conn
+
+
+def release_es_connection(cloud_id: str, credentials: Optional[Tuple[str, str]], client_class: type = Elasticsearch) -> Any:
+    """
+    Remove a client from the registry, so the caller can close it.
+
+    Returns:
+        The client that was registered, or None.
+    """
+    key = (cloud_id, tuple(credentials) if credentials else None, client_class)
+    with _connections_lock:
+        return _connections.pop(key, None)
+
+
 class ESConnector:
 
     def __init__(self, cloud_id: str, credentials: Optional[Tuple[str, str]] = None):
         """
-        Initialize the ESConnector.
+        Initialize the ESConnector. The client is taken from the shared connection
+        registry on first use.
 
         Args:
-            es_url (str): The URL of the Elasticsearch cluster.
+            cloud_id (str): The cloud ID of the Elasticsearch deployment.
             credentials (Optional[Tuple[str, str]]): A tuple containing the username and password for authentication.
 
         """
         self.cloud_id=cloud_id
         self.credentials = credentials
-        self.conn = self.create_es_connection()
+
+    @property
+    def conn(self) -> Elasticsearch:
+        return self.create_es_connection()
 
     def create_es_connection(self) -> Elasticsearch:
         """
-        Create a connection to the Elasticsearch cluster.
+        Get the shared connection to the Elasticsearch cluster.
 
         Returns:
             Elasticsearch: An Elasticsearch client instance.
         """
-        username,password=self.credentials[0],self.credentials[1]
-        es = Elasticsearch(
-            cloud_id=self.cloud_id,
-            basic_auth=(username, password)
-        )
-        logger.info(f"Connection created for cloud_id: {self.cloud_id}")
-        return es
+        return get_es_connection(self.cloud_id, self.credentials)
+
+    def close(self) -> None:
+        """Close the shared client for this cluster; the next call opens a new one."""
+        conn = release_es_connection(self.cloud_id, self.credentials)
+        if conn is not None:
+            conn.close()
 
     def ping(self) -> None:
         if self.conn.ping():
@@ -226,67 +335,233 @@ class ESIndexer(ESConnector):
             logger.error(f"An error occurred while updating the document in {index_name}: {e}")
 
 
+# Index settings switched off while bulk loading, and the values a load switches them to
+BULK_LOAD_SETTINGS = {
+    "index.refresh_interval": "-1",
+    "index.number_of_replicas": 0
+}
+
+
 class ESBulkIndexer(ESIndexer):
 
+    # Loads in progress per index, shared by every instance so overlapping loads (e.g.
+    # concurrent batch jobs) only restore the settings once the last one ends
+    _bulk_loads: Dict[str, Dict[str, Any]] = {}
+    _bulk_loads_lock = threading.Lock()
+
     def __init__(self, cloud_id: str, credentials: Optional[Tuple[str, str]] = None):
         super().__init__(cloud_id, credentials)
 
-    def bulk_upload_documents(self, index_name: str, documents: list[dict[str, Any]], id_col: str) -> int:
+    def begin_bulk_load(self, index_name: str) -> None:
         """
-        Bulk upload documents to an Elasticsearch index.
+        Disable refreshes and replicas on an index for a bulk load, remembering the values
+        set on the index (or that none was). Nested or concurrent loads of the same index
+        are reference counted.
 
         Args:
-            es_conn (Elasticsearch): The Elasticsearch connection object.
             index_name (str): The name of the index.
-            documents (list[dict[str, Any]]): The list of documents to upload.
+        """
+        with self._bulk_loads_lock:
+            load = self._bulk_loads.get(index_name)
+            if load is not None:
+                load["count"] += 1
+                return
+            try:
+                response = self.conn.indices.get_settings(
+                    index=index_name, name=list(BULK_LOAD_SETTINGS), flat_settings=True
+                )
+                # Settings left at the cluster default are saved as None, which resets them on restore
+                current = response[index_name].get("settings", {})
+                saved = {name: current.get(name) for name in BULK_LOAD_SETTINGS}
+                self.conn.indices.put_settings(index=index_name, settings=BULK_LOAD_SETTINGS)
+                self._bulk_loads[index_name] = {"count": 1, "saved": saved}
+                logger.info(f"Bulk load started on {index_name}: refresh and replicas disabled")
+            except Exception as e:
+                logger.error(f"An error occurred while preparing {index_name} for bulk loading: {e}")
+
+    def end_bulk_load(self, index_name: str) -> None:
+        """
+        Restore the refresh interval and replicas saved by begin_bulk_load once the last
+        load of the index ends, and refresh it so the loaded documents become searchable.
 
-        Returns:
-            int: The number of successfully indexed documents.
+        Args:
+            index_name (str): The name of the index.
         """
-        actions = [
-            {
+        with self._bulk_loads_lock:
+            load = self._bulk_loads.get(index_name)
+            if load is None:
+                return
+            load["count"] -= 1
+            if load["count"] > 0:
+                return
+            del self._bulk_loads[index_name]
+            try:
+                self.conn.indices.put_settings(index=index_name, settings=load["saved"])
+                self.conn.indices.refresh(index=index_name)
+                logger.info(f"Bulk load finished on {index_name}: settings restored to {load['saved']}")
+            except Exception as e:
+                logger.error(f"An error occurred while restoring settings of {index_name} after bulk loading: {e}")
+
+    @contextmanager
+    def bulk_load(self, index_name: str):
+        """
+        Context manager running a bulk load with refresh_interval -1 and zero replicas.
+
+        Usage:
+            with es_bulk_indexer.bulk_load(index_name):
+                es_bulk_indexer.bulk_upload_documents(index_name, documents, id_col='link')
+        """
+        self.begin_bulk_load(index_name)
+        try:
+            yield
+        finally:
+            self.end_bulk_load(index_name)
+
+    def upsert_actions(self, index_name: str, documents: Iterable[dict[str, Any]], id_col: str) -> Iterator[dict[str, Any]]:
+        """
+        Turn documents into bulk upsert actions lazily, one at a time.
+
+        Args:
+            index_name (str): The name of the index.
+            documents (Iterable[dict[str, Any]]): The documents to upsert.
+            id_col (str): The document field used as the document ID.
+
+        Yields:
+            dict: One update action with doc_as_upsert per document.
+        """
+        for document in documents:
+            yield {
                 "_op_type": "update",
                 "_index": index_name,
                 "_id": document[id_col],
                 "doc": document,
                 "doc_as_upsert": True
             }
-            for document in documents
-        ]
 
+    def bulk_index(self, actions: Iterable[dict[str, Any]], chunk_size: int = 500, max_chunk_bytes: int = 10 * 1024 * 1024,
+                   thread_count: int = 1, max_retries: int = 5, initial_backoff: float = 2,
+                   max_backoff: float = 60) -> Tuple[int, List[dict[str, Any]]]:
+        """
+        Stream bulk actions to Elasticsearch without materializing them.
+
+        Actions are sent in chunks of at most chunk_size actions and max_chunk_bytes bytes.
+        Items rejected with 429 (es_rejected_execution) are retried with exponential backoff,
+        starting at initial_backoff seconds and doubling up to max_backoff, at most
+        max_retries times. With thread_count > 1, chunks are sent by that many threads
+        and rejected items are retried once the stream is done.
+
+        Args:
+            actions (Iterable[dict[str, Any]]): Any iterable of bulk actions, e.g. a generator.
+            chunk_size (int): The maximum number of actions per bulk request.
+            max_chunk_bytes (int): The maximum size in bytes of a bulk request.
+            thread_count (int): The number of threads sending chunks in parallel.
+            max_retries (int): How many times rejected items are retried.
+            initial_backoff (float): Seconds to wait before the first retry.
+            max_backoff (float): The maximum seconds to wait between retries.
+
+        Returns:
+            Tuple[int, List[dict[str, Any]]]: The number of successful actions, and the details
+            (op_type, _index, _id, status, error) of every action that failed for good.
+        """
+        success = 0
+        failures = []
+        if thread_count > 1:
+            # parallel_bulk yields results in action order, so each result is matched with the
+            # action it came from; only the chunks in flight are held in memory
+            in_flight = deque()
+
+            def track(actions):
+                for action in actions:
+                    in_flight.append(action)
+                    yield action
+
+            rejected = []
+            results = parallel_bulk(
+                self.conn, track(actions), thread_count=thread_count, chunk_size=chunk_size,
+                max_chunk_bytes=max_chunk_bytes, raise_on_error=False, raise_on_exception=False
+            )
+            for ok, item in results:
+                action = in_flight.popleft()
+                if ok:
+                    success += 1
+                elif bulk_item_status(item) == 429:
+                    rejected.append(action)
+                else:
+                    failures.append(bulk_item_error(item))
+            if not rejected:
+                return success, failures
+            logger.warning(f"Retrying {len(rejected)} rejected actions")
+            time.sleep(initial_backoff)
+            actions = rejected
+            initial_backoff = min(initial_backoff * 2, max_backoff)
+
+        results = streaming_bulk(
+            self.conn, actions, chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes,
+            raise_on_error=False, raise_on_exception=False, max_retries=max_retries,
+            initial_backoff=initial_backoff, max_backoff=max_backoff
+        )
+        for ok, item in results:
+            if ok:
+                success += 1
+            else:
+                failures.append(bulk_item_error(item))
+        return success, failures
+
+    def bulk_upload_documents(self, index_name: str, documents: Iterable[dict[str, Any]], id_col: str,
+                              chunk_size: int = 500, max_chunk_bytes: int = 10 * 1024 * 1024,
+                              thread_count: int = 1) -> int:
+        """
+        Bulk upload documents to an Elasticsearch index.
+
+        Args:
+            index_name (str): The name of the index.
+            documents (Iterable[dict[str, Any]]): The documents to upload, as a list or a generator.
+            id_col (str): The document field used as the document ID.
+            chunk_size (int): The maximum number of documents per bulk request.
+            max_chunk_bytes (int): The maximum size in bytes of a bulk request.
+            thread_count (int): The number of threads sending chunks in parallel.
+
+        Returns:
+            int: The number of successfully indexed documents.
+        """
         try:
-            success, failed = bulk(self.conn, actions)
+            success, failed = self.bulk_index(
+                self.upsert_actions(index_name, documents, id_col),
+                chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes, thread_count=thread_count
+            )
             logger.info(f"Successfully indexed {success} documents to {index_name}")
             if failed:
                 logger.warning(f"Failed to index {len(failed)} documents")
+                for failure in failed[:5]:
+                    logger.warning(f"Failed to index {failure['_id']} ({failure['status']}): {failure['error']}")
             return success
         except Exception as e:
             logger.error(f"An error occurred while bulk uploading documents to {index_name}: {e}")
             return 0
         
 
-    def bulk_delete_documents(self, index_name: str, document_ids: list[str]) -> int:
+    def bulk_delete_documents(self, index_name: str, document_ids: Iterable[str]) -> int:
         """
         Bulk delete documents from an Elasticsearch index.
 
         Args:
             index_name (str): The name of the index.
-            document_ids (list[str]): The list of document IDs to delete.
+            document_ids (Iterable[str]): The document IDs to delete, as a list or a generator.
 
         Returns:
             int: The number of successfully deleted documents.
         """
-        actions = [
+        actions = (
             {
                 "_op_type": "delete",
                 "_index": index_name,
                 "_id": doc_id
             }
             for doc_id in document_ids
-        ]
+        )
 
         try:
-            success, failed = bulk(self.conn, actions)
+            success, failed = self.bulk_index(actions)
             logger.info(f"Successfully deleted {success} documents from {index_name}")
             if failed:
                 logger.warning(f"Failed to delete {len(failed)} documents")
@@ -372,4 +647,160 @@ class ESQueryMaker(ESConnector):
             return response
         except Exception as e:
             logger.error(f"Error executing search on index: {index_name} with query: {query}. Error: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    def scan_index(self, index_name: str, query: Optional[Dict] = None, source: Optional[List[str]] = None, size: int = 1000):
+        """
+        Iterate over every document in an index matching a query.
+
+        Args:
+            index_name (str): The name of the index to scan.
+            query (Optional[Dict]): The query clause to match. Defaults to match_all.
+            source (Optional[List[str]]): The fields to return. Defaults to the whole document.
+            size (int): The number of documents fetched per request.
+
+        Yields:
+            Dict: The raw hits, with '_id' and '_source'.
+        """
+        body = {"query": query or {"match_all": {}}}
+        if source is not None:
+            body["_source"] = source
+        try:
+            yield from scan(self.conn, index=index_name, query=body, size=size)
+        except NotFoundError:
+            logger.warning(f"Index {index_name} not found.")
+
+    def get_documents(self, index_name: str, doc_ids: List[str], source: Optional[List[str]] = None, chunk_size: int = 1000) -> Dict[str, Dict]:
+        """
+        Look up many documents by ID with multi-get requests.
+
+        Args:
+            index_name (str): The name of the index.
+            doc_ids (List[str]): The IDs of the documents to look up.
+            source (Optional[List[str]]): The fields to return. Defaults to the whole document.
+            chunk_size (int): The maximum number of IDs per request.
+
+        Returns:
+            Dict[str, Dict]: The source of each document found, keyed by ID. Missing IDs are left out.
+        """
+        found = {}
+        doc_ids = list(dict.fromkeys(doc_ids))
+        try:
+            for start in range(0, len(doc_ids), chunk_size):
+                response = self.conn.mget(index=index_name, ids=doc_ids[start:start + chunk_size], source=source)
+                for doc in response["docs"]:
+                    if doc.get("found"):
+                        found[doc["_id"]] = doc.get("_source", {})
+        except NotFoundError:
+            logger.warning(f"Index {index_name} not found.")
+        return found
+
+    def open_point_in_time(self, index_name: str, keep_alive: str = "10m") -> str:
+        """
+        Open a point in time (PIT) on an index, a consistent view for paging with search_after.
+
+        Args:
+            index_name (str): The name of the index.
+            keep_alive (str): How long the PIT lives without being used, e.g. "10m".
+
+        Returns:
+            str: The PIT ID.
+        """
+        response = self.conn.open_point_in_time(index=index_name, keep_alive=keep_alive)
+        return response["id"]
+
+    def close_point_in_time(self, pit_id: str) -> None:
+        try:
+            self.conn.close_point_in_time(id=pit_id)
+        except NotFoundError:
+            logger.warning("Point in time already expired.")
+        except Exception as e:
+            logger.error(f"An error occurred while closing a point in time: {e}")
+
+    def iter_document_pages(self, index_name: str, query: Optional[Dict] = None, source_includes: Optional[List[str]] = None,
+                            source_excludes: Optional[List[str]] = None, page_size: int = 1000, keep_alive: str = "10m",
+                            pit_id: Optional[str] = None, slice_id: Optional[int] = None,
+                            max_slices: Optional[int] = None, fetch_source: bool = True) -> Iterator[List[Dict]]:
+        """
+        Page through every document matching a query with a point in time and search_after.
+
+        Unlike a scroll, nothing has to be fetched within a fixed window: each page request
+        extends the PIT by keep_alive, so keep_alive only needs to outlast processing one page.
+        With max_slices > 1 the documents are split into that many disjoint slices, and each
+        worker drains its own slice_id (0 to max_slices - 1) of a shared pit_id.
+
+        Args:
+            index_name (str): The name of the index.
+            query (Optional[Dict]): The query clause to match. Defaults to match_all.
+            source_includes (Optional[List[str]]): The fields to return. Defaults to all.
+            source_excludes (Optional[List[str]]): Fields to leave out of the returned source.
+            page_size (int): The number of documents per page.
+            keep_alive (str): How long the PIT lives between page requests.
+            pit_id (Optional[str]): An open PIT to use. If None, one is opened and closed here.
+            slice_id (Optional[int]): The slice to read when slicing.
+            max_slices (Optional[int]): The number of slices the documents are split into.
+            fetch_source (bool): If False, hits carry no '_source' at all, only '_id'.
+
+        Yields:
+            List[Dict]: Pages of raw hits, with '_id' and '_source'.
+        """
+        own_pit = pit_id is None
+        if own_pit:
+            pit_id = self.open_point_in_time(index_name, keep_alive)
+
+        body = {
+            "query": query or {"match_all": {}},
+            "size": page_size,
+            "sort": [{"_shard_doc": "asc"}]
+        }
+        if not fetch_source:
+            body["_source"] = False
+        elif source_includes or source_excludes:
+            body["_source"] = {"includes": source_includes or [], "excludes": source_excludes or []}
+        if max_slices and max_slices > 1:
+            body["slice"] = {"id": slice_id, "max": max_slices}
+
+        try:
+            while True:
+                body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+                response = self.conn.search(body=body)
+                pit_id = response.get("pit_id", pit_id)
+                hits = response["hits"]["hits"]
+                if not hits:
+                    break
+                yield hits
+                if len(hits) < page_size:
+                    break
+                body["search_after"] = hits[-1]["sort"]
+        finally:
+            if own_pit:
+                self.close_point_in_time(pit_id)
+
+    def iter_documents(self, index_name: str, query: Optional[Dict] = None, source_includes: Optional[List[str]] = None,
+                       source_excludes: Optional[List[str]] = None, page_size: int = 1000, keep_alive: str = "10m",
+                       pit_id: Optional[str] = None, slice_id: Optional[int] = None,
+                       max_slices: Optional[int] = None, fetch_source: bool = True) -> Iterator[Dict]:
+        """
+        Iterate over every document matching a query, one hit at a time. Takes the same
+        arguments as iter_document_pages.
+
+        Yields:
+            Dict: The raw hits, with '_id' and '_source'.
+        """
+        for page in self.iter_document_pages(index_name, query, source_includes, source_excludes, page_size,
+                                             keep_alive, pit_id, slice_id, max_slices, fetch_source):
+            yield from page
+
+    def get_ids(self, index_name: str, query: Optional[Dict] = None, page_size: int = 10000) -> set:
+        """
+        Collect the IDs of every document matching a query, without fetching any source.
+
+        Args:
+            index_name (str): The name of the index.
+            query (Optional[Dict]): The query clause to match. Defaults to match_all.
+            page_size (int): The number of IDs fetched per request.
+
+        Returns:
+            set: The document IDs.
+        """
+        return {hit["_id"] for hit in self.iter_documents(index_name, query, page_size=page_size, fetch_source=False)}
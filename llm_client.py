@@ -0,0 +1,196 @@
+import os
+import asyncio
+import logging
+import threading
+from typing import Optional, Dict, Any
+from openai import (AsyncAzureOpenAI, DefaultAsyncHttpxClient, Timeout, DEFAULT_CONNECTION_LIMITS,
+                    RateLimitError, APIConnectionError, InternalServerError)
+from rate_limiter import estimate_tokens
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+API_VERSION = "2024-06-01"
+MAX_COMPLETION_TOKENS = 4096
+
+# HTTP options applied to every client the registry creates
+LLM_CLIENT_OPTIONS = {
+    "timeout": 120.0,
+    "connect_timeout": 10.0,
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+}
+
+# The HTTP library's Limits class, taken from openai's own default so it always matches the
+# transport openai was built against without importing that library here
+Limits = type(DEFAULT_CONNECTION_LIMITS)
+
+# One async client (and connection pool) per endpoint and key in the process
+_clients: Dict[tuple, AsyncAzureOpenAI] = {}
+_clients_lock = threading.Lock()
+
+
+def configure_llm_client(**options: Any) -> None:
+    """
+    Change the HTTP options used by the client registry. Only clients created afterwards
+    are affected, so call this before the first request.
+
+    Args:
+        **options: Any of the LLM_CLIENT_OPTIONS keys, e.g. timeout (seconds for a whole
+            request), connect_timeout, max_connections or max_keepalive_connections
+            (pooled connections kept open between requests).
+    """
+    unknown = set(options) - set(LLM_CLIENT_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown LLM client options: {', '.join(sorted(unknown))}")
+    LLM_CLIENT_OPTIONS.update(options)
+
+
+def get_llm_client(api_key: Optional[str] = None, azure_endpoint: Optional[str] = None,
+                   api_version: str = API_VERSION) -> AsyncAzureOpenAI:
+    """
+    Get the process-wide async Azure OpenAI client for an endpoint, creating it on first
+    use. Every caller with the same endpoint and key shares the client and its pool of
+    keep-alive connections. Retries are left to AsyncLLMClient, so the client never retries.
+
+    Args:
+        api_key (Optional[str]): The Azure OpenAI key, AZURE_OPENAI_KEY_1 by default.
+        azure_endpoint (Optional[str]): The endpoint, AZURE_OPENAI_ENDPOINT by default.
+        api_version (str): The Azure OpenAI API version.
+
+    Returns:
+        AsyncAzureOpenAI: The shared client instance.
+    """
+    api_key = api_key or os.getenv("AZURE_OPENAI_KEY_1")
+    azure_endpoint = azure_endpoint or os.getenv("AZURE_OPENAI_ENDPOINT")
+    key = (azure_endpoint, api_key, api_version)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            timeout = Timeout(LLM_CLIENT_OPTIONS["timeout"], connect=LLM_CLIENT_OPTIONS["connect_timeout"])
+            http_client = DefaultAsyncHttpxClient(
+                timeout=timeout,
+                limits=Limits(
+                    max_connections=LLM_CLIENT_OPTIONS["max_connections"],
+                    max_keepalive_connections=LLM_CLIENT_OPTIONS["max_keepalive_connections"],
+                    keepalive_expiry=LLM_CLIENT_OPTIONS["keepalive_expiry"]
+                )
+            )
+            client = AsyncAzureOpenAI(
+                api_key=api_key,
+                api_version=api_version,
+                azure_endpoint=azure_endpoint,
+                timeout=timeout,
+                max_retries=0,
+                http_client=http_client
+            )
+            _clients[key] = client
+            logger.info(f"AsyncAzureOpenAI client created for endpoint: {azure_endpoint}")
+        return client
+
+
+async def close_llm_clients() -> None:
+    """
+    Close every client in the registry and its connections. Call this before the event
+    loop that used them ends; later requests create new clients.
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        await client.close()
+
+
+def retry_after_seconds(error: Exception, default: float) -> float:
+    """
+    Get the wait requested by a 429 response.
+
+    Args:
+        error (Exception): The RateLimitError raised by the client.
+        default (float): Seconds to wait if the response names none.
+
+    Returns:
+        float: Seconds from retry-after-ms (sent by Azure) or Retry-After, else default.
+    """
+    headers = error.response.headers if getattr(error, "response", None) is not None else {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return default
+
+
+class AsyncLLMClient:
+
+    def __init__(self, deployment: Optional[str] = None, rate_limiter: Any = None, max_retries: int = 5,
+                 timeout: Optional[float] = None, max_tokens: int = MAX_COMPLETION_TOKENS):
+        """
+        Initialize the AsyncLLMClient. Chat completions go through the shared client from
+        the registry, so every instance reuses the same connections.
+
+        Args:
+            deployment (Optional[str]): The deployment to call, AZURE_OPENAI_DEPLOYMENT_NAME by default.
+            rate_limiter (Any): An optional RateLimiter shared by all callers of the deployment.
+            max_retries (int): Retries after a 429, timeout, connection error or 5xx.
+            timeout (Optional[float]): Seconds per request, LLM_CLIENT_OPTIONS["timeout"] by default.
+            max_tokens (int): Completion tokens reserved for each request.
+        """
+        self.deployment = deployment or os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.logger = logging.getLogger(__name__)
+
+    async def complete(self, system_prompt: str, user_prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        Run one chat completion, retrying transient failures with exponential backoff.
+        A 429 waits for its Retry-After; with a rate limiter, the wait pauses every caller.
+
+        Args:
+            system_prompt (str): The system message.
+            user_prompt (str): The user message.
+            timeout (Optional[float]): Seconds for this request, overriding the instance default.
+
+        Returns:
+            str: The completion text.
+        """
+        client = get_llm_client()
+        timeout = timeout or self.timeout
+        estimated_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt) + self.max_tokens
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(estimated_tokens)
+            try:
+                response = await client.chat.completions.create(
+                    model=self.deployment,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    max_tokens=self.max_tokens,
+                    **({"timeout": timeout} if timeout else {})
+                )
+            except (RateLimitError, APIConnectionError, InternalServerError) as e:
+                # APIConnectionError includes APITimeoutError
+                if attempt == self.max_retries:
+                    self.logger.error(f"LLM request failed after {attempt + 1} attempts: {str(e)}")
+                    raise
+                delay = min(60, 2 ** attempt)
+                if isinstance(e, RateLimitError):
+                    delay = retry_after_seconds(e, delay)
+                    if self.rate_limiter:
+                        self.rate_limiter.penalize(delay)
+                        continue
+                self.logger.warning(f"LLM request failed ({str(e)}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if self.rate_limiter:
+                usage = response.usage.total_tokens if response.usage else None
+                self.rate_limiter.release(estimated_tokens, usage)
+            return response.choices[0].message.content.strip()
@@ -1,17 +1,15 @@
 import os
+import sys
 import logging
-import os
-from openai import AzureOpenAI
 from prompts import BASIC_RAG_PROMPT
 from dotenv import load_dotenv
 load_dotenv()
 
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_KEY_1"),  
-    api_version="2024-06-01",
-    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    )
-    
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+from llm_client import AsyncLLMClient
+sys.path.pop(0)
+
 AZURE_OPENAI_DEPLOYMENT_NAME=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
 # Set up logging
 logging.basicConfig(level=logging.INFO,
@@ -20,13 +18,13 @@ logging.basicConfig(level=logging.INFO,
 logger = logging.getLogger(__name__)
 
 class LLMProcessor:
-    def __init__(self, api_key=None, model="gpt-4o"):
+    def __init__(self, api_key=None, model="gpt-4o", max_retries=5, timeout=None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.model = model
-        self.client = AzureOpenAI(
-                            api_key=os.getenv("AZURE_OPENAI_KEY_1"),  
-                            api_version="2024-06-01",
-                            azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+        self.client = AsyncLLMClient(
+                            deployment=AZURE_OPENAI_DEPLOYMENT_NAME,
+                            max_retries=max_retries,
+                            timeout=timeout
                             )
         self.logger = logging.getLogger(__name__)
         self.logger.info(f"LLMProcessor initialized with model: {self.model}")
@@ -34,16 +32,9 @@ class LLMProcessor:
     async def _process_request(self, system_prompt, user_prompt):
         self.logger.info(f"Processing request with model: {self.model}")
         try:
-            response = self.client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT_NAME,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=4096
-            )
+            result = await self.client.complete(system_prompt, user_prompt)
             self.logger.info("Request processed successfully")
-            return response.choices[0].message.content.strip()
+            return result
         except Exception as e:
             self.logger.error(f"Error processing request: {str(e)}")
             raise
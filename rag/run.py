@@ -11,7 +11,8 @@ import json
 
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, parent_dir)
-from elastic_helpers import ESBulkIndexer, ESQueryMaker
+from async_elastic_helpers import AsyncESQueryMaker
+from llm_client import configure_llm_client, close_llm_clients
 from elastic_config import BASIC_CONFIG
 sys.path.pop(0)
 
@@ -32,15 +33,14 @@ ELASTIC_CLOUD_ID = os.environ.get('ELASTIC_CLOUD_ID')
 ELASTIC_USERNAME = os.environ.get('ELASTIC_USERNAME')
 ELASTIC_PASSWORD = os.environ.get('ELASTIC_PASSWORD')
 ELASTIC_CLOUD_AUTH = (ELASTIC_USERNAME, ELASTIC_PASSWORD)
-es_bulk_indexer = ESBulkIndexer(cloud_id=ELASTIC_CLOUD_ID, credentials=ELASTIC_CLOUD_AUTH)
-es_query_maker = ESQueryMaker(cloud_id=ELASTIC_CLOUD_ID, credentials=ELASTIC_CLOUD_AUTH)
+es_query_maker = AsyncESQueryMaker(cloud_id=ELASTIC_CLOUD_ID, credentials=ELASTIC_CLOUD_AUTH)
 
 async def search_es(index_name, query_text, fields, n):
     try:
         logger.info(f"Searching index: {index_name} with query: {query_text}")
         
         # Perform the search
-        results = es_query_maker.search_index(index_name, query_text, fields)
+        results = await es_query_maker.search_index(index_name, query_text, fields)
         await asyncio.sleep(1)  # 1 second delay
 
         # Extract the top n hits
@@ -86,6 +86,9 @@ async def run(index_name, query_text, fields, n):
     except Exception as e:
         logger.error(f"An error occurred during the run: {str(e)}")
         logger.debug(traceback.format_exc())
+    finally:
+        await es_query_maker.close()
+        await close_llm_clients()
 
 def main():
     parser = argparse.ArgumentParser(description="Search Elasticsearch index and return results.")
@@ -93,8 +96,11 @@ def main():
     parser.add_argument("query_text", help="Text to search for")
     parser.add_argument("fields", nargs='+', help="Fields to search in")
     parser.add_argument("--n", type=int, default=10, help="Number of results to return (default: 10)")
+    parser.add_argument("--llm-timeout", type=float, default=120, help="Seconds before the LLM request times out and is retried (default: 120)")
     args = parser.parse_args()
 
+    configure_llm_client(timeout=args.llm_timeout)
+
     try:
         asyncio.run(run(args.index_name, args.query_text, args.fields, args.n))
     except Exception as e:
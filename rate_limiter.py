@@ -0,0 +1,104 @@
+import time
+import math
+import asyncio
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+# Rough characters per token for English text; close enough to budget requests
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text or '') / CHARS_PER_TOKEN)
+
+
+class TokenBucket:
+    '''
+    Holds up to capacity units, refilled continuously at rate_per_minute. A capacity of
+    None means unlimited.
+    '''
+    def __init__(self, rate_per_minute=None, capacity=None):
+        self.capacity = capacity or rate_per_minute
+        self.rate = rate_per_minute / 60 if rate_per_minute else None
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        '''Seconds until amount units are available.'''
+        if self.capacity is None:
+            return 0.0
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def consume(self, amount):
+        if self.capacity is not None:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+
+    def refund(self, amount):
+        if self.capacity is not None:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+    def drain(self):
+        if self.capacity is not None:
+            self._refill()
+            self.level = min(self.level, 0)
+
+
+class RateLimiter:
+    '''
+    Keeps LLM calls within a deployment's requests-per-minute and tokens-per-minute quota.
+
+    Each call first acquires one request and its estimated tokens (prompt plus the
+    max_tokens reserved for the completion, which is how Azure OpenAI counts against
+    the quota), waiting in arrival order until both buckets allow it. Once the call
+    returns, release refunds whatever the estimate overshot the actual usage.
+
+    On a 429, penalize pauses every caller for the Retry-After period and empties the
+    buckets, so traffic resumes gradually instead of all at once.
+    '''
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.logger = logging.getLogger(__name__)
+        self._paused_until = 0.0
+        self._lock = None
+
+    async def acquire(self, tokens):
+        '''Wait until a request of the given token count fits. Returns the tokens taken.'''
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                wait = max(
+                    self._paused_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(tokens)
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            return tokens
+
+    def release(self, estimated_tokens, actual_tokens):
+        if actual_tokens is not None and actual_tokens < estimated_tokens:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def penalize(self, retry_after):
+        self.logger.warning(f"Rate limited by the LLM deployment, pausing all requests for {retry_after:.1f}s")
+        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self.requests.drain()
+        self.tokens.drain()
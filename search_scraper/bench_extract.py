@@ -0,0 +1,69 @@
+'''
+Micro-benchmark of the extraction engines over a corpus of saved pages.
+
+Save pages as .html files in a folder, e.g.
+    curl -sL https://www.tech.gov.sg/ -o corpus/techgov.html
+then run
+    python3 ./search_scraper/bench_extract.py ./corpus --repeat 5
+'''
+import os
+import time
+import logging
+import argparse
+import statistics
+from extractor import EXTRACTION_ENGINES
+
+
+def load_corpus(folder_path):
+    pages = []
+    for filename in sorted(os.listdir(folder_path)):
+        if not filename.lower().endswith(('.html', '.htm')):
+            continue
+        with open(os.path.join(folder_path, filename), encoding='utf-8', errors='replace') as f:
+            pages.append((filename, f.read()))
+    return pages
+
+
+def bench_engine(fn, pages, repeat):
+    timings = []
+    outputs = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for filename, html in pages:
+            outputs[filename] = fn(html, f"https://example.com/{filename}")
+        timings.append(time.perf_counter() - start)
+    return timings, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare extraction engines on a corpus of saved HTML pages.")
+    parser.add_argument("corpus", help="Folder containing saved .html pages")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of passes over the corpus (default: 3)")
+    args = parser.parse_args()
+
+    # Silence the per-page "Extracting content" log lines
+    logging.getLogger('extractor').setLevel(logging.WARNING)
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print(f"No .html files found in {args.corpus}")
+        return
+    total_bytes = sum(len(html.encode('utf-8')) for _, html in pages)
+    print(f"Corpus: {len(pages)} pages, {total_bytes / 1e6:.2f} MB, {args.repeat} passes\n")
+
+    results = {}
+    for name, fn in EXTRACTION_ENGINES.items():
+        timings, outputs = bench_engine(fn, pages, args.repeat)
+        results[name] = outputs
+        best = min(timings)
+        print(f"{name:>10}: best {best:.3f}s, median {statistics.median(timings):.3f}s, "
+              f"{best / len(pages) * 1000:.2f} ms/page, {total_bytes / best / 1e6:.2f} MB/s")
+
+    baseline, fast = results['html2text'], results['fast']
+    text_ratio = sum(len(fast[f]['all_text']) for f in fast) / max(1, sum(len(baseline[f]['all_text']) for f in baseline))
+    link_ratio = sum(len(fast[f]['links']) for f in fast) / max(1, sum(len(baseline[f]['links']) for f in baseline))
+    print(f"\nfast/html2text output size: text {text_ratio:.2f}x, links {link_ratio:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
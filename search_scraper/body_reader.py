@@ -0,0 +1,167 @@
+import re
+import codecs
+import logging
+
+try:
+    from charset_normalizer import from_bytes
+except ImportError:  # aiohttp normally pulls charset_normalizer in; fall back to cp1252 without it
+    from_bytes = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+# Leading bytes of binary formats that are sometimes served with a text/html header
+MAGIC_SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'RIFF', 'application/octet-stream'),
+    (b'OggS', 'audio/ogg'),
+    (b'ID3', 'audio/mpeg'),
+    (b'\x1f\x8b', 'application/gzip'),
+    (b'7z\xbc\xaf\x27\x1c', 'application/x-7z-compressed'),
+    (b'Rar!\x1a\x07', 'application/vnd.rar'),
+    (b'\x7fELF', 'application/x-executable'),
+    (b'MZ', 'application/x-msdownload'),
+]
+
+TEXT_CONTENT_TYPES = ('text/', 'application/xhtml+xml', 'application/xml')
+DOCUMENT_CONTENT_TYPES = (
+    'application/pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+)
+
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+CHARSET_HEADER_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+CHARSET_META_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.I)
+
+# Bytes handed to charset detection when nothing is declared and the body is not UTF-8
+DETECTION_SAMPLE_BYTES = 64 * 1024
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class UnsupportedContent(Exception):
+    pass
+
+
+class DocumentContent(UnsupportedContent):
+    '''
+    Raised when the body turns out to be a document (PDF, DOCX) rather than text.
+    Carries the bytes already consumed so the caller can keep streaming the body.
+    '''
+    def __init__(self, content_type, first_chunk):
+        super().__init__(f"Document content: {content_type}")
+        self.content_type = content_type
+        self.first_chunk = first_chunk
+
+
+def sniff_content_type(first_chunk, declared_type):
+    '''
+    Content type of a response judged from its first chunk. Magic bytes win over the
+    declared header; otherwise the declared type is returned.
+    '''
+    for signature, content_type in MAGIC_SIGNATURES:
+        if first_chunk.startswith(signature):
+            # DOCX is a zip container; trust the header to say which kind
+            if content_type == 'application/zip' and declared_type.startswith(DOCUMENT_CONTENT_TYPES):
+                return declared_type
+            return content_type
+    if b'\x00' in first_chunk[:1024] and not first_chunk.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'application/octet-stream'
+    return declared_type
+
+
+def declared_charset(content_type, first_chunk):
+    for bom, encoding in BOMS:
+        if first_chunk.startswith(bom):
+            return encoding
+    match = CHARSET_HEADER_RE.search(content_type)
+    if match is None:
+        match = CHARSET_META_RE.search(first_chunk[:4096])
+        if match is None:
+            return None
+        charset = match.group(1).decode('ascii', 'ignore')
+    else:
+        charset = match.group(1)
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
+
+
+def decode_undeclared(raw):
+    '''UTF-8 fast path, falling back to detection on a bounded sample.'''
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        pass
+    encoding = None
+    if from_bytes is not None:
+        best = from_bytes(raw[:DETECTION_SAMPLE_BYTES]).best()
+        encoding = best.encoding if best else None
+    return raw.decode(encoding or 'cp1252', errors='replace')
+
+
+async def read_text(response, max_bytes, chunk_size=64 * 1024):
+    '''
+    Read and decode a text response body incrementally.
+
+    The content type is checked against the magic bytes of the first chunk, and the
+    read is aborted with BodyTooLarge once more than max_bytes have arrived, so a
+    mislabelled multi-hundred-MB download never gets buffered whole.
+
+    Returns (text, content_type). Raises DocumentContent for PDF/DOCX bodies and
+    UnsupportedContent for other non-text bodies.
+    '''
+    declared_type = response.headers.get('Content-Type', '').lower()
+    if (response.content_length is not None and response.content_length > max_bytes
+            and not declared_type.startswith(DOCUMENT_CONTENT_TYPES)):
+        raise BodyTooLarge(f"Content-Length {response.content_length} exceeds cap of {max_bytes} bytes")
+
+    content_type = declared_type
+    decoder = None
+    parts = []
+    raw = bytearray()
+    total = 0
+    first = True
+
+    async for chunk in response.content.iter_chunked(chunk_size):
+        if first:
+            first = False
+            content_type = sniff_content_type(chunk, declared_type)
+            if content_type.startswith(DOCUMENT_CONTENT_TYPES):
+                raise DocumentContent(content_type, chunk)
+            if content_type and not content_type.startswith(TEXT_CONTENT_TYPES):
+                raise UnsupportedContent(f"Non-text content: {content_type}")
+            charset = declared_charset(declared_type, chunk)
+            if charset:
+                decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+
+        total += len(chunk)
+        if total > max_bytes:
+            raise BodyTooLarge(f"Body exceeds cap of {max_bytes} bytes")
+
+        if decoder is not None:
+            parts.append(decoder.decode(chunk))
+        else:
+            raw.extend(chunk)
+
+    if decoder is not None:
+        parts.append(decoder.decode(b'', final=True))
+        return ''.join(parts), content_type
+    return decode_undeclared(bytes(raw)), content_type
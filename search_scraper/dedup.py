@@ -0,0 +1,126 @@
+import re
+import hashlib
+import logging
+from collections import Counter, defaultdict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+')
+FINGERPRINT_BITS = 64
+
+
+def simhash(text, shingle_size=3):
+    '''64-bit SimHash of the word shingles of text.'''
+    words = WORD_RE.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = Counter([' '.join(words)])
+    else:
+        shingles = Counter(' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle, count in shingles.items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    '''
+    LSH index over SimHash fingerprints. Fingerprints are split into max_distance + 1
+    bands; by pigeonhole, two fingerprints within max_distance bits agree exactly on at
+    least one band, so only documents sharing a band bucket are compared.
+    '''
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_width = -(-FINGERPRINT_BITS // self.bands)
+        self.buckets = defaultdict(list)
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_width) - 1
+        return [(i, fingerprint >> (i * self.band_width) & mask) for i in range(self.bands)]
+
+    def find(self, fingerprint):
+        '''Returns the id of an indexed near-duplicate of fingerprint, or None.'''
+        for key in self._band_keys(fingerprint):
+            for other, doc_id in self.buckets.get(key, ()):
+                if hamming_distance(fingerprint, other) <= self.max_distance:
+                    return doc_id
+        return None
+
+    def add(self, fingerprint, doc_id):
+        for key in self._band_keys(fingerprint):
+            self.buckets[key].append((fingerprint, doc_id))
+
+
+class NearDuplicateDetector:
+    '''
+    Fingerprints the all_text of scraped items and marks near-duplicates of earlier
+    items (or of documents already in the index) before they are indexed.
+
+    Every item gets a 'simhash' field (hex string) so later runs can load fingerprints
+    from the index instead of rescanning text. Duplicates get 'duplicate_of' set to the
+    link of the document they copy; with collapse=True they are dropped instead. Other
+    items get 'duplicate_of' set to None, which clears a flag left by an earlier run
+    (indexing is a partial update, so a missing key would keep the stored value).
+    Items with fewer than min_words words are not fingerprinted.
+    '''
+    def __init__(self, max_distance=6, min_words=50, collapse=False, text_field='all_text'):
+        self.index = NearDuplicateIndex(max_distance=max_distance)
+        self.min_words = min_words
+        self.collapse = collapse
+        self.text_field = text_field
+        self.logger = logging.getLogger(__name__)
+
+    def load_fingerprints(self, docs):
+        '''Seed the index from (doc_id, simhash hex) pairs of already indexed documents.'''
+        count = 0
+        for doc_id, fingerprint in docs:
+            self.index.add(int(fingerprint, 16), doc_id)
+            count += 1
+        self.logger.info(f"Loaded {count} existing fingerprints")
+
+    def check(self, item):
+        '''Fingerprint item in place; returns the link it duplicates, or None.'''
+        text = item.get(self.text_field) or ''
+        if len(WORD_RE.findall(text)) < self.min_words:
+            item['duplicate_of'] = None
+            return None
+        fingerprint = simhash(text)
+        item['simhash'] = format(fingerprint, '016x')
+        original = self.index.find(fingerprint)
+        if original is not None and original != item['link']:
+            item['duplicate_of'] = original
+            return original
+        item['duplicate_of'] = None
+        self.index.add(fingerprint, item['link'])
+        return None
+
+    def process(self, items):
+        kept = []
+        duplicates = 0
+        for item in items:
+            original = self.check(item)
+            if original is not None:
+                duplicates += 1
+                self.logger.info(f"Near-duplicate: {item['link']} copies {original}")
+                if self.collapse:
+                    continue
+            kept.append(item)
+        self.logger.info(f"Near-duplicate detection: {duplicates} of {len(items)} items are near-duplicates"
+                         + (" (dropped)" if self.collapse else " (flagged)"))
+        return kept
@@ -0,0 +1,82 @@
+import logging
+from url_utils import url_host
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+
+class DomainFilter:
+    '''
+    Allow/deny filter over domains. A listed domain matches itself and all of its
+    subdomains ("twitter.com" blocks "mobile.twitter.com" but not "nottwitter.com").
+
+    Domains are held in hash sets and a host is checked by walking its label suffixes
+    (a.b.example.com -> b.example.com -> example.com -> com), so a lookup costs one set
+    probe per label regardless of list size. Allow entries take precedence over deny
+    entries.
+    '''
+    def __init__(self, deny_domains=(), allow_domains=()):
+        self.logger = logging.getLogger(__name__)
+        self.deny = set()
+        self.allow = set()
+        self.add_deny(deny_domains)
+        self.add_allow(allow_domains)
+
+    @staticmethod
+    def normalize_domain(entry):
+        '''
+        Accepts plain domains, "*.domain" / ".domain" wildcards and hosts-file lines
+        ("0.0.0.0 domain"). Returns None for blank lines and comments.
+        '''
+        entry = entry.split('#', 1)[0].strip()
+        if not entry:
+            return None
+        entry = entry.split()[-1].lower().rstrip('.')
+        if entry.startswith('*.'):
+            entry = entry[2:]
+        return entry.lstrip('.') or None
+
+    def _add(self, target, domains):
+        for entry in domains:
+            domain = self.normalize_domain(entry)
+            if domain:
+                target.add(domain)
+
+    def add_deny(self, domains):
+        self._add(self.deny, domains)
+
+    def add_allow(self, domains):
+        self._add(self.allow, domains)
+
+    def _load(self, target, path):
+        before = len(target)
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            self._add(target, f)
+        self.logger.info(f"Loaded {len(target) - before} domains from {path}")
+
+    def load_deny_file(self, path):
+        self._load(self.deny, path)
+
+    def load_allow_file(self, path):
+        self._load(self.allow, path)
+
+    @staticmethod
+    def _matches(host, domains):
+        while True:
+            if host in domains:
+                return True
+            dot = host.find('.')
+            if dot < 0:
+                return False
+            host = host[dot + 1:]
+
+    def is_blocked(self, url):
+        host = url_host(url)
+        if not host or not self.deny:
+            return False
+        if self.allow and self._matches(host, self.allow):
+            return False
+        return self._matches(host, self.deny)
@@ -0,0 +1,77 @@
+import os
+import asyncio
+import logging
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+
+class ExtractionPool:
+    '''
+    Runs CPU-bound extraction functions in a process pool so that parsing does not
+    block the event loop. Functions and their arguments must be picklable.
+
+    With use_processes=False, functions run inline on the calling thread instead.
+    initializer(*initargs) runs once in each worker process, and once in the calling
+    process so that inline runs see the same state.
+    '''
+    def __init__(self, max_workers=None, use_processes=True, initializer=None, initargs=()):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        self.initializer = initializer
+        self.initargs = initargs
+        if initializer is not None:
+            initializer(*initargs)
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self.logger.info(f"Starting extraction process pool with {self.max_workers} workers")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=self.initializer,
+                initargs=self.initargs
+            )
+        return self._executor
+
+    async def run(self, fn, *args):
+        '''
+        Run fn(*args) in the pool. If the pool breaks (a worker died, e.g. OOM on a
+        pathological page), it is replaced and the item retried once on the new pool;
+        if that fails too, None is returned and the item counts as a failed extraction.
+        Nothing is ever run inline in the main process as a fallback.
+        '''
+        if not self.use_processes:
+            return fn(*args)
+
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool as e:
+                self._replace_broken(executor, e)
+        self.logger.error(f"Extraction failed twice on a broken process pool, giving up on {fn.__name__}")
+        return None
+
+    def _replace_broken(self, executor, error):
+        # Every future pending on the broken pool lands here; only the first replaces it,
+        # so a pool another coroutine already rebuilt is not thrown away
+        if self._executor is not executor:
+            return
+        self.logger.error(f"Extraction process pool broke, restarting it: {str(error)}")
+        self.logger.debug(traceback.format_exc())
+        executor.shutdown(wait=False)
+        self._executor = None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,249 @@
+import logging
+import re
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+import html2text
+import lxml.html
+from lxml.etree import ParserError
+from domain_filter import DomainFilter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+# Extraction lives in module-level functions with plain str/dict inputs and outputs
+# so that it can be shipped to worker processes. The link filter is process-wide
+# state, installed once per worker through configure_link_filter rather than
+# pickled with every page.
+
+SOCIAL_MEDIA_DOMAINS = [
+    'facebook.com', 'twitter.com', 'x.com', 'instagram.com', 'linkedin.com',
+    'pinterest.com', 'reddit.com', 'tumblr.com', 'snapchat.com',
+    'tiktok.com', 'youtube.com', 'whatsapp.com', 'telegram.org',
+    'medium.com', 'quora.com'
+]
+
+_link_filter = DomainFilter(deny_domains=SOCIAL_MEDIA_DOMAINS)
+
+
+# Subtrees that never contribute visible text
+SKIP_TAGS = {
+    'script', 'style', 'noscript', 'template', 'head', 'title', 'meta', 'link',
+    'svg', 'canvas', 'iframe', 'object', 'embed', 'select', 'option'
+}
+
+# Elements whose boundaries separate words even without surrounding whitespace
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section',
+    'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul'
+}
+
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+# Containers whose text is boilerplate for main-content extraction
+BOILERPLATE_TAGS = {'nav', 'footer', 'aside', 'form', 'menu', 'dialog'}
+BOILERPLATE_ROLES = {'navigation', 'banner', 'contentinfo', 'complementary', 'search', 'dialog'}
+BOILERPLATE_HINT_RE = re.compile(
+    r'(?:^|[\s_-])(?:nav|navbar|navigation|menu|footer|sidebar|cookies?|consent|gdpr|banner|breadcrumbs?|'
+    r'share|sharing|social|related|promo|advert|ads|sponsored|subscribe|newsletter|popup|modal|comments?)(?:$|[\s_-])',
+    re.I
+)
+
+_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True)
+
+
+def configure_link_filter(domain_filter):
+    global _link_filter
+    _link_filter = domain_filter
+
+
+def clean_text(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def extract_content(html_content, base_url, main_content=False):
+    logger.info(f"Extracting content from {base_url}")
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    # Extract all visible text
+    h = html2text.HTML2Text()
+    h.ignore_links = True
+    h.ignore_images = True
+    all_text = clean_text(h.handle(str(soup)))
+
+    # Extract links
+    links = []
+    seen_urls = set()
+    for a in soup.find_all('a', href=True):
+        href = a.get('href')
+        full_url = urljoin(base_url, href)
+        if full_url not in seen_urls and not _link_filter.is_blocked(full_url):
+            links.append({'text': clean_text(a.text), 'href': full_url})
+            seen_urls.add(full_url)
+
+    result = {
+        'link': base_url,
+        'all_text': all_text,
+        'links': links,
+    }
+    if main_content:
+        # Boilerplate scoring needs the block structure, which html2text discards
+        main_text = fast_extract_content(html_content, base_url, main_content=True)['main_text']
+        result['main_text'] = main_text
+        result['main_text_ratio'] = round(len(main_text) / max(1, len(all_text)), 3)
+    return result
+
+
+class _MainContentCollector:
+    '''
+    Classifies the text blocks of a page as main content or boilerplate. A block is the
+    text between two block-level boundaries. It is kept when it has enough words (text
+    density), few of its characters are link text (link density), and it does not sit
+    inside navigation, footers, sidebars or similar containers. Headings are kept
+    regardless of length.
+    '''
+    def __init__(self, parts, min_words, max_link_density):
+        self.parts = parts
+        self.min_words = min_words
+        self.max_link_density = max_link_density
+        self.blocks = []
+        self.start = 0
+        self.link_chars = 0
+        self.boilerplate_chars = 0
+
+    def add(self, text, in_link, in_boilerplate):
+        if in_link:
+            self.link_chars += len(text)
+        if in_boilerplate:
+            self.boilerplate_chars += len(text)
+
+    def flush(self, heading=False):
+        raw = ''.join(self.parts[self.start:])
+        link_chars, boilerplate_chars = self.link_chars, self.boilerplate_chars
+        self.start = len(self.parts)
+        self.link_chars = self.boilerplate_chars = 0
+
+        words = raw.split()
+        if not words or boilerplate_chars * 2 > len(raw):
+            return
+        if link_chars / len(raw) > self.max_link_density:
+            return
+        if heading or len(words) >= self.min_words:
+            self.blocks.append(' '.join(words))
+
+
+def is_boilerplate_element(el):
+    if el.tag in BOILERPLATE_TAGS or el.get('role') in BOILERPLATE_ROLES:
+        return True
+    hints = f"{el.get('class', '')} {el.get('id', '')}"
+    return bool(hints.strip()) and BOILERPLATE_HINT_RE.search(hints) is not None
+
+
+def fast_extract_content(html_content, base_url, main_content=False, min_words=10, max_link_density=0.33):
+    '''
+    Single-pass extraction on lxml. Visible text and deduplicated links are collected
+    in the same walk over the tree, and the result has the same shape as extract_content.
+    Text is plain (no markdown markup from html2text).
+
+    With main_content=True the same walk also separates the article body from
+    boilerplate (see _MainContentCollector), adding 'main_text' and 'main_text_ratio'
+    (length of main_text relative to all_text) to the result.
+    '''
+    logger.info(f"Extracting content from {base_url}")
+
+    try:
+        # Parse from bytes so that documents carrying an XML encoding declaration are accepted
+        root = lxml.html.document_fromstring(html_content.encode('utf-8', 'replace'), parser=_HTML_PARSER)
+    except (ParserError, ValueError):
+        result = {'link': base_url, 'all_text': '', 'links': []}
+        if main_content:
+            result.update({'main_text': '', 'main_text_ratio': 0.0})
+        return result
+
+    parts = []
+    links = []
+    seen_urls = set()
+    open_anchors = []
+    collector = _MainContentCollector(parts, min_words, max_link_density) if main_content else None
+    boilerplate_depth = 0
+
+    # Explicit stack instead of recursion: deeply nested pages would hit the recursion limit
+    stack = [(root, False, False)]
+    while stack:
+        el, closing, boilerplate = stack.pop()
+        tag = el.tag
+        if closing:
+            if tag in BLOCK_TAGS:
+                if collector:
+                    collector.flush(heading=tag in HEADING_TAGS)
+                parts.append(' ')
+            if open_anchors and open_anchors[-1][0] is el:
+                _, href, start = open_anchors.pop()
+                full_url = urljoin(base_url, href)
+                if full_url not in seen_urls and not _link_filter.is_blocked(full_url):
+                    links.append({'text': ' '.join(''.join(parts[start:]).split()), 'href': full_url})
+                    seen_urls.add(full_url)
+            if boilerplate:
+                boilerplate_depth -= 1
+            if el.tail:
+                parts.append(el.tail)
+                if collector:
+                    collector.add(el.tail, bool(open_anchors), boilerplate_depth > 0)
+            continue
+
+        if not isinstance(tag, str) or tag in SKIP_TAGS:
+            if el.tail:
+                parts.append(el.tail)
+                if collector:
+                    collector.add(el.tail, bool(open_anchors), boilerplate_depth > 0)
+            continue
+
+        if tag in BLOCK_TAGS:
+            if collector:
+                collector.flush()
+            parts.append(' ')
+        if collector and is_boilerplate_element(el):
+            boilerplate = True
+            boilerplate_depth += 1
+        if tag == 'a':
+            href = el.get('href')
+            if href is not None:
+                open_anchors.append((el, href, len(parts)))
+        if el.text:
+            parts.append(el.text)
+            if collector:
+                collector.add(el.text, bool(open_anchors), boilerplate_depth > 0)
+
+        stack.append((el, True, boilerplate))
+        for child in reversed(el):
+            stack.append((child, False, False))
+
+    result = {
+        'link': base_url,
+        'all_text': ' '.join(''.join(parts).split()),
+        'links': links,
+    }
+    if collector:
+        collector.flush()
+        result['main_text'] = '\n\n'.join(collector.blocks)
+        result['main_text_ratio'] = round(len(result['main_text']) / max(1, len(result['all_text'])), 3)
+        logger.info(f"Main content of {base_url} is {result['main_text_ratio']:.0%} of the page text")
+    return result
+
+
+EXTRACTION_ENGINES = {
+    'fast': fast_extract_content,
+    'html2text': extract_content,
+}
+
+
+def get_extraction_engine(name):
+    try:
+        return EXTRACTION_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown extraction engine '{name}'. Choose from: {', '.join(EXTRACTION_ENGINES)}")
@@ -0,0 +1,116 @@
+import re
+import math
+import heapq
+import hashlib
+import logging
+from collections import Counter
+from urllib.parse import urlsplit
+from url_utils import normalize_url, url_host
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+# Links to these are assets, not pages worth crawling
+SKIP_EXTENSIONS = (
+    '.css', '.js', '.json', '.xml', '.rss', '.ico', '.png', '.jpg', '.jpeg', '.gif', '.svg',
+    '.webp', '.mp3', '.mp4', '.avi', '.mov', '.zip', '.gz', '.tar', '.rar', '.7z', '.exe', '.dmg'
+)
+
+WORD_RE = re.compile(r'\w+')
+
+
+class BloomFilter:
+    '''
+    Fixed-size probabilistic set. Membership tests may give false positives at
+    roughly error_rate once capacity items are stored, but never false negatives.
+    '''
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(self.size // 8 + 1)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item):
+        '''Add item; returns False if it was (probably) already present.'''
+        added = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                added = True
+        return added
+
+
+class CrawlFrontier:
+    '''
+    Priority queue of URLs to crawl. URLs are normalized and deduplicated through a
+    Bloom filter, capped per domain and by depth, and popped in order of relevance:
+    overlap of the anchor text and URL with the query terms, then shallower depth first.
+    '''
+    def __init__(self, max_depth=1, per_domain_budget=20, query=None, domain_filter=None,
+                 seen_capacity=1_000_000):
+        self.max_depth = max_depth
+        self.per_domain_budget = per_domain_budget
+        self.query_terms = set(WORD_RE.findall(query.lower())) if query else set()
+        self.domain_filter = domain_filter
+        self.seen = BloomFilter(capacity=seen_capacity)
+        self.domain_counts = Counter()
+        self.logger = logging.getLogger(__name__)
+        self._heap = []
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def score(self, url, anchor_text):
+        if not self.query_terms:
+            return 0.0
+        words = set(WORD_RE.findall(f"{anchor_text} {urlsplit(url).path}".lower()))
+        return len(words & self.query_terms) / len(self.query_terms)
+
+    def add(self, url, depth, anchor_text='', seed=False):
+        '''
+        Queue url at the given depth unless it was seen before. Seeds bypass the depth,
+        budget and filter checks.
+        Returns True if the URL was queued.
+        '''
+        if not url.startswith(('http://', 'https://')):
+            return False
+        key = normalize_url(url)
+        host = url_host(key)
+        if not seed:
+            if depth > self.max_depth:
+                return False
+            if urlsplit(key).path.lower().endswith(SKIP_EXTENSIONS):
+                return False
+            if self.domain_counts[host] >= self.per_domain_budget:
+                return False
+            if self.domain_filter and self.domain_filter.is_blocked(key):
+                return False
+        if not self.seen.add(key):
+            return False
+
+        self.domain_counts[host] += 1
+        self._counter += 1
+        # Seeds always go ahead of discovered links
+        priority = -math.inf if seed else -self.score(key, anchor_text)
+        heapq.heappush(self._heap, (priority, depth, self._counter, url))
+        return True
+
+    def pop(self):
+        '''Returns (url, depth) of the most promising URL, or None if empty.'''
+        if not self._heap:
+            return None
+        _, depth, _, url = heapq.heappop(self._heap)
+        return url, depth
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from url_utils import normalize_url
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+
+class HTTPCache:
+    '''
+    Persistent on-disk cache of fetched pages, keyed on the normalized URL.
+
+    Bodies are stored zlib-compressed in a SQLite file together with their ETag and
+    Last-Modified headers, so stale entries can be revalidated with a conditional
+    request. The extracted result is cached alongside the body, tagged with the
+    extraction engine that produced it, so cache hits skip re-extraction.
+
+    Entries younger than ttl seconds are served without touching the network. The
+    total stored size is kept under max_bytes by evicting least recently used entries.
+    '''
+    def __init__(self, cache_dir, ttl=24 * 60 * 60, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'http_cache.db'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                body BLOB,
+                engine TEXT,
+                extracted TEXT,
+                size INTEGER,
+                fetched_at REAL,
+                last_access REAL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self.conn.commit()
+
+    def get(self, url):
+        key = normalize_url(url)
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT etag, last_modified, content_type, body, engine, extracted, fetched_at '
+                'FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            self.conn.commit()
+
+        etag, last_modified, content_type, body, engine, extracted, fetched_at = row
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': content_type,
+            'body': zlib.decompress(body).decode('utf-8') if body else None,
+            'engine': engine,
+            'extracted': json.loads(extracted) if extracted else None,
+            'fetched_at': fetched_at,
+        }
+
+    def is_fresh(self, entry):
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, body, response_headers, engine=None, extracted=None):
+        key = normalize_url(url)
+        compressed = zlib.compress(body.encode('utf-8'))
+        extracted_json = json.dumps(extracted) if extracted is not None else None
+        size = len(compressed) + len(extracted_json or '')
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO entries '
+                '(key, etag, last_modified, content_type, body, engine, extracted, size, fetched_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, response_headers.get('ETag'), response_headers.get('Last-Modified'),
+                 response_headers.get('Content-Type'), compressed, engine, extracted_json, size, now, now)
+            )
+            self.conn.commit()
+            self._evict()
+
+    def update_extracted(self, url, engine, extracted):
+        key = normalize_url(url)
+        extracted_json = json.dumps(extracted) if extracted is not None else None
+        with self._lock:
+            # Size is the stored body plus the new extraction, as in put
+            self.conn.execute(
+                'UPDATE entries SET engine = ?, extracted = ?, size = COALESCE(LENGTH(body), 0) + ? WHERE key = ?',
+                (engine, extracted_json, len(extracted_json or ''), key)
+            )
+            self.conn.commit()
+            self._evict()
+
+    def touch(self, url):
+        '''Mark an entry as revalidated (e.g. after a 304), restarting its TTL.'''
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            self.conn.execute('UPDATE entries SET fetched_at = ?, last_access = ? WHERE key = ?', (now, now, key))
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self.conn.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+        self.conn.commit()
+        self.logger.info(f"Evicted {evicted} entries from HTTP cache")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
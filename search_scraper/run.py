@@ -1,17 +1,28 @@
 import os
 import sys
+import csv
+import json
+import time
 import logging
 import traceback
 import asyncio
 import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from webscraper import WebScraper
+from webscraper import WebScraper, iter_items
 from search_engine import SearchEngine
+from http_cache import HTTPCache
+from search_cache import SearchCache
+from domain_filter import DomainFilter
+from extractor import SOCIAL_MEDIA_DOMAINS
+from dedup import NearDuplicateDetector
+from streaming_indexer import StreamingIndexer
 
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, parent_dir)
-from elastic_helpers import ESBulkIndexer
-from elastic_config import BASIC_CONFIG
+from elastic_helpers import ESBulkIndexer, ESQueryMaker, configure_es_connections
+from elastic_config import RAW_CONFIG
 sys.path.pop(0)
 
 load_dotenv()
@@ -32,61 +43,375 @@ ELASTIC_USERNAME = os.environ.get('ELASTIC_USERNAME')
 ELASTIC_PASSWORD = os.environ.get('ELASTIC_PASSWORD')
 ELASTIC_CLOUD_AUTH = (ELASTIC_USERNAME, ELASTIC_PASSWORD)
 es_bulk_indexer = ESBulkIndexer(cloud_id=ELASTIC_CLOUD_ID, credentials=ELASTIC_CLOUD_AUTH)
+es_query_maker = ESQueryMaker(cloud_id=ELASTIC_CLOUD_ID, credentials=ELASTIC_CLOUD_AUTH)
 
-async def run(entity, query, skip_search=False, skip_scrape=False, skip_index=False):
+def load_existing_fingerprints(detector, index_name):
+    hits = es_query_maker.scan_index(
+        index_name,
+        query={"bool": {"filter": {"exists": {"field": "simhash"}}, "must_not": {"exists": {"field": "duplicate_of"}}}},
+        source=["simhash"]
+    )
+    detector.load_fingerprints((hit['_id'], hit['_source']['simhash']) for hit in hits)
+
+def stale_items(items, index_name, max_age_hours, log):
+    """
+    Split candidate search items into those worth fetching and those already fresh in the
+    index, with one batched lookup of their links (the documents' IDs).
+
+    Returns:
+        tuple: The items to fetch (new, stale or never timestamped) and the number skipped.
+    """
+    existing = es_query_maker.get_documents(index_name, [item['link'] for item in items], source=['fetched_at'])
+    now = datetime.now(timezone.utc)
+    to_fetch = []
+    skipped = 0
+    for item in items:
+        doc = existing.get(item['link'])
+        if doc is None:
+            log.info(f"New, fetching: {item['link']}")
+        elif not doc.get('fetched_at'):
+            log.info(f"No fetched_at stored, refetching: {item['link']}")
+        else:
+            age_hours = (now - datetime.fromisoformat(doc['fetched_at'])).total_seconds() / 3600
+            if age_hours <= max_age_hours:
+                skipped += 1
+                log.info(f"Fresh ({age_hours:.1f}h old), skipping: {item['link']}")
+                continue
+            log.info(f"Stale ({age_hours:.1f}h old), refetching: {item['link']}")
+        to_fetch.append(item)
+    return to_fetch, skipped
+
+# Options a batch job may set per line; anything else falls back to the command-line value
+JOB_OPTIONS = {
+    'skip_search': bool,
+    'skip_scrape': bool,
+    'skip_index': bool,
+    'crawl_depth': int,
+    'max_pages': int,
+    'per_domain_budget': int,
+    'dedup': bool,
+    'collapse_duplicates': bool,
+    'num_results': int,
+    'refresh_search': bool,
+    'incremental': bool,
+    'max_age_hours': float,
+}
+
+# Serializes existence checks and creation per index, so concurrent jobs for the same
+# entity never recreate (and wipe) an index another job just created
+index_locks = defaultdict(asyncio.Lock)
+
+class JobLogger(logging.LoggerAdapter):
+    def process(self, msg, kwargs):
+        return f"[{self.extra['entity']}] {msg}", kwargs
+
+async def ensure_index(index_name):
+    async with index_locks[index_name]:
+        index_exists = await asyncio.to_thread(es_bulk_indexer.check_index_existence, index_name=index_name)
+        if not index_exists:
+            logger.info(f"Creating new index: {index_name}")
+            await asyncio.to_thread(es_bulk_indexer.create_es_index, es_configuration=RAW_CONFIG, index_name=index_name)
+
+async def run(entity, query, skip_search=False, skip_scrape=False, skip_index=False,
+              crawl_depth=0, max_pages=200, per_domain_budget=20, dedup=True, collapse_duplicates=False,
+              num_results=10, refresh_search=False, incremental=False, max_age_hours=168,
+              bulk_max_docs=100, bulk_max_bytes=5 * 1024 * 1024, bulk_flush_seconds=10.0, bulk_load=False):
+    """
+    Search, scrape and index one entity/query pair.
+
+    Returns:
+        dict: A summary of the job with item counts, elapsed seconds and status.
+    """
+    log = JobLogger(logger, {'entity': entity})
+    summary = {'entity': entity, 'query': query, 'fresh_skipped': 0, 'scraped': 0, 'with_text': 0,
+               'duplicates': 0, 'indexed': 0, 'status': 'ok'}
+    start_time = time.time()
     try:
         if not skip_search:
-            logger.info(f"Performing search for query: {query}")
-            search_result = search_engine.google_custom_search(query=query)
-            logger.info(f"Search completed. Found {len(search_result['items'])} results.")
+            log.info(f"Performing search for query: {query}")
+            if skip_scrape or crawl_depth > 0 or incremental:
+                search_result = await search_engine.search(query=query, num_results=num_results, bypass_cache=refresh_search)
+                log.info(f"Search completed. Found {len(search_result['items'])} results.")
+            else:
+                # Results are handed to the scraper page by page as they arrive
+                search_result = {'items': search_engine.iter_search(query=query, num_results=num_results, bypass_cache=refresh_search)}
         else:
-            logger.info("Skipping search step.")
+            log.info("Skipping search step.")
             search_result = {'items': []}  # Placeholder for skipped search
 
+        # Prepare index name
+        index_name = f"raw__{entity}"
+
+        index_exists = False
+        if not skip_scrape and (incremental or (dedup and not skip_index)):
+            index_exists = await asyncio.to_thread(es_bulk_indexer.check_index_existence, index_name=index_name)
+
+        if incremental and not skip_scrape and index_exists:
+            # Only new pages and pages older than max_age_hours are fetched again
+            search_result['items'], summary['fresh_skipped'] = await asyncio.to_thread(
+                stale_items, search_result['items'], index_name, max_age_hours, log
+            )
+            log.info(f"Incremental refresh: fetching {len(search_result['items'])} new or stale pages, "
+                     f"skipping {summary['fresh_skipped']} fresh ones.")
+
+        detector = None
+        if dedup and not skip_scrape:
+            detector = NearDuplicateDetector(collapse=collapse_duplicates)
+            if not skip_index and index_exists:
+                await asyncio.to_thread(load_existing_fingerprints, detector, index_name)
+
         if not skip_scrape:
-            logger.info("Starting web scraping.")
-            scraped = await webscraper.scrape_urls_from_list(search_result['items'])
-            logger.info(f"Web scraping completed. Scraped {len(scraped)} items.")
+            if crawl_depth > 0:
+                log.info(f"Starting crawl to depth {crawl_depth}.")
+                scraped = webscraper.iter_crawl(
+                    search_result['items'],
+                    max_depth=crawl_depth,
+                    max_pages=max_pages,
+                    per_domain_budget=per_domain_budget,
+                    query=query
+                )
+            else:
+                log.info("Starting web scraping.")
+                scraped = webscraper.iter_scrape(search_result['items'])
         else:
-            logger.info("Skipping web scraping step.")
-            scraped = search_result['items']  # Use search results if scraping is skipped
+            log.info("Skipping web scraping step.")
+            scraped = iter_items(search_result['items'])  # Use search results if scraping is skipped
 
+        indexer = None
         if not skip_index:
-            # Prepare index name
-            index_name = f"raw__{entity}"
-
             # Check if index exists, create if not
-            index_exists = es_bulk_indexer.check_index_existence(index_name=index_name)
-            if not index_exists:
-                logger.info(f"Creating new index: {index_name}")
-                es_bulk_indexer.create_es_index(es_configuration=BASIC_CONFIG, index_name=index_name)
-
-            # Update documents in Elasticsearch
-            success_count = es_bulk_indexer.bulk_upload_documents(
-                index_name=index_name, 
-                documents=scraped, 
-                id_col='link'
+            await ensure_index(index_name)
+            # Documents are bulk-uploaded while the rest are still being scraped
+            indexer = StreamingIndexer(
+                es_bulk_indexer,
+                index_name,
+                id_col='link',
+                max_docs=bulk_max_docs,
+                max_bytes=bulk_max_bytes,
+                flush_interval=bulk_flush_seconds
             )
-            logger.info(f"Indexing completed. Successfully indexed {success_count} documents.")
+            if bulk_load:
+                await asyncio.to_thread(es_bulk_indexer.begin_bulk_load, index_name)
+            indexer.start()
         else:
-            logger.info("Skipping indexing step.")
+            log.info("Skipping indexing step.")
 
-        logger.info("Process completed successfully.")
+        try:
+            async for item in scraped:
+                summary['scraped'] += 1
+                if item.get('all_text'):
+                    summary['with_text'] += 1
+                if detector is not None:
+                    original = await asyncio.to_thread(detector.check, item)
+                    if original is not None:
+                        summary['duplicates'] += 1
+                        log.info(f"Near-duplicate: {item['link']} copies {original}")
+                        if collapse_duplicates:
+                            continue
+                if indexer is not None:
+                    await indexer.put(item)
+        finally:
+            # Flush whatever was scraped, even if the run is failing
+            if indexer is not None:
+                summary['indexed'] = await indexer.close()
+                if bulk_load:
+                    await asyncio.to_thread(es_bulk_indexer.end_bulk_load, index_name)
+        log.info(f"Web scraping completed. Scraped {summary['scraped']} items.")
+        if indexer is not None:
+            log.info(f"Indexing completed. Successfully indexed {summary['indexed']} documents.")
+
+        log.info("Process completed successfully.")
     except Exception as e:
-        logger.error(f"An error occurred: {str(e)}")
-        logger.debug(traceback.format_exc())
+        summary['status'] = f"error: {str(e)}"
+        log.error(f"An error occurred: {str(e)}")
+        log.debug(traceback.format_exc())
+    summary['seconds'] = round(time.time() - start_time, 2)
+    return summary
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+def load_jobs(path):
+    """
+    Read batch jobs from a JSONL file (one object per line) or a CSV file with a header
+    row. Each job needs 'entity' and 'query'; other JOB_OPTIONS keys are optional.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    jobs = []
+    for line_no, row in enumerate(rows, 1):
+        if not row.get('entity') or not row.get('query'):
+            logger.warning(f"Skipping job {line_no}: 'entity' and 'query' are required")
+            continue
+        job = {'entity': row['entity'], 'query': row['query']}
+        for option, option_type in JOB_OPTIONS.items():
+            if row.get(option) not in (None, ''):
+                job[option] = parse_bool(row[option]) if option_type is bool else option_type(row[option])
+        jobs.append(job)
+    return jobs
+
+async def run_batch(jobs, defaults, max_concurrent_jobs=4):
+    """
+    Run many jobs in one process. Up to max_concurrent_jobs run at once, sharing the
+    search session, the scraper's fetch limits and the Elasticsearch clients, so the
+    searches, scrapes and bulk writes of different jobs overlap.
+    """
+    semaphore = asyncio.Semaphore(max_concurrent_jobs)
+
+    async def run_job(job):
+        async with semaphore:
+            return await run(**{**defaults, **job})
+
+    start_time = time.time()
+    summaries = await asyncio.gather(*(run_job(job) for job in jobs))
+    failed = sum(1 for summary in summaries if summary['status'] != 'ok')
+    logger.info(f"Batch completed: {len(jobs)} jobs in {time.time() - start_time:.2f} seconds, {failed} failed")
+    for summary in summaries:
+        logger.info(f"[{summary['entity']}] {summary['status']}: {summary['fresh_skipped']} fresh skipped, scraped {summary['scraped']} "
+                    f"({summary['with_text']} with text), {summary['duplicates']} duplicates, "
+                    f"indexed {summary['indexed']} in {summary['seconds']}s")
+    return summaries
 
 def main():
     parser = argparse.ArgumentParser(description="Search, scrape, and index web content.")
-    parser.add_argument("entity", help="The entity to search for")
-    parser.add_argument("query", help="The search query")
+    parser.add_argument("entity", nargs="?", help="The entity to search for")
+    parser.add_argument("query", nargs="?", help="The search query")
+    parser.add_argument("--batch", help="JSONL or CSV file of jobs (entity, query and optional per-job options) to run in one process")
+    parser.add_argument("--max-concurrent-jobs", type=int, default=4, help="Batch jobs run at the same time (default: 4)")
+    parser.add_argument("--summary-out", help="Write per-job summaries of a batch to this JSONL file")
     parser.add_argument("--skip-search", action="store_true", help="Skip the search step")
     parser.add_argument("--skip-scrape", action="store_true", help="Skip the web scraping step")
     parser.add_argument("--skip-index", action="store_true", help="Skip the indexing step")
+    parser.add_argument("--num-results", type=int, default=10, help="Number of search results to fetch, up to 100 (default: 10)")
+    parser.add_argument("--no-search-cache", action="store_true", help="Do not read or write the local search result cache")
+    parser.add_argument("--refresh-search", action="store_true", help="Ignore cached search results but store the fresh ones")
+    parser.add_argument("--search-cache-ttl", type=float, default=24, help="Hours before cached search results expire (default: 24)")
+    parser.add_argument("--search-cache-max-entries", type=int, default=10000, help="Maximum cached search result pages (default: 10000)")
+    parser.add_argument("--incremental", action="store_true", help="Skip search results already indexed in raw__{entity} and fetched within --max-age-hours")
+    parser.add_argument("--max-age-hours", type=float, default=168, help="Age after which an indexed page is fetched again in incremental mode (default: 168)")
+    parser.add_argument("--crawl-depth", type=int, default=0, help="Follow links from search results up to this many hops (default: 0, no crawl)")
+    parser.add_argument("--max-pages", type=int, default=200, help="Maximum pages fetched when crawling (default: 200)")
+    parser.add_argument("--per-domain-budget", type=int, default=20, help="Maximum pages per domain when crawling (default: 20)")
+    parser.add_argument("--no-dedup", action="store_true", help="Skip near-duplicate detection")
+    parser.add_argument("--collapse-duplicates", action="store_true", help="Drop near-duplicates instead of flagging them with duplicate_of")
+    parser.add_argument("--max-concurrency", type=int, default=10, help="Maximum concurrent fetches overall (default: 10)")
+    parser.add_argument("--per-host-concurrency", type=int, default=2, help="Maximum concurrent fetches per host (default: 2)")
+    parser.add_argument("--per-host-delay", type=float, default=1.0, help="Minimum seconds between requests to the same host (default: 1.0)")
+    parser.add_argument("--queue-size", type=int, default=100, help="Maximum number of pending fetches (default: 100)")
+    parser.add_argument("--inline-extraction", action="store_true", help="Extract content on the event loop instead of in a process pool")
+    parser.add_argument("--extraction-engine", choices=["fast", "html2text"], default="fast", help="Content extraction engine (default: fast)")
+    parser.add_argument("--extraction-workers", type=int, default=None, help="Number of extraction processes (default: CPU count)")
+    parser.add_argument("--deny-list", action="append", default=[], help="File of domains never to fetch or keep links to (repeatable)")
+    parser.add_argument("--allow-list", action="append", default=[], help="File of domains exempt from the deny lists (repeatable)")
+    parser.add_argument("--main-content", action="store_true", help="Also extract the main article body (main_text) without navigation and other boilerplate")
+    parser.add_argument("--max-body-mb", type=float, default=10, help="Abort downloads larger than this many MB (default: 10)")
+    parser.add_argument("--skip-documents", action="store_true", help="Skip PDF and DOCX responses instead of extracting them")
+    parser.add_argument("--max-document-mb", type=float, default=50, help="Skip documents larger than this many MB (default: 50)")
+    parser.add_argument("--max-document-pages", type=int, default=200, help="Extract at most this many pages per document (default: 200)")
+    parser.add_argument("--no-http-cache", action="store_true", help="Always download pages instead of using the local HTTP cache")
+    parser.add_argument("--http-cache-dir", default=os.path.join(parent_dir, '.cache', 'http'), help="Directory of the local HTTP cache")
+    parser.add_argument("--http-cache-ttl", type=float, default=24, help="Hours before a cached page is revalidated (default: 24)")
+    parser.add_argument("--http-cache-max-mb", type=int, default=512, help="Maximum size of the local HTTP cache in MB (default: 512)")
+    parser.add_argument("--bulk-max-docs", type=int, default=100, help="Documents per bulk request while streaming to Elasticsearch (default: 100)")
+    parser.add_argument("--bulk-max-mb", type=float, default=5, help="Maximum size of a bulk request in MB (default: 5)")
+    parser.add_argument("--bulk-flush-seconds", type=float, default=10, help="Flush a partial bulk request after this many seconds (default: 10)")
+    parser.add_argument("--bulk-load", action="store_true", help="Disable refreshes and replicas on the raw index while indexing, restoring them afterwards")
+    parser.add_argument("--es-connections-per-node", type=int, default=10, help="Pooled Elasticsearch connections per node (default: 10)")
+    parser.add_argument("--es-request-timeout", type=float, default=30, help="Seconds before an Elasticsearch request times out (default: 30)")
+    parser.add_argument("--es-no-compress", action="store_true", help="Send Elasticsearch request bodies uncompressed")
 
     args = parser.parse_args()
+    if not args.batch and not (args.entity and args.query):
+        parser.error("entity and query are required unless --batch is given")
 
-    asyncio.run(run(args.entity, args.query, args.skip_search, args.skip_scrape, args.skip_index))
+    configure_es_connections(
+        connections_per_node=args.es_connections_per_node,
+        request_timeout=args.es_request_timeout,
+        http_compress=not args.es_no_compress
+    )
+
+    domain_filter = DomainFilter(deny_domains=SOCIAL_MEDIA_DOMAINS)
+    for path in args.deny_list:
+        domain_filter.load_deny_file(path)
+    for path in args.allow_list:
+        domain_filter.load_allow_file(path)
+
+    http_cache = None
+    if not args.no_http_cache:
+        http_cache = HTTPCache(
+            cache_dir=args.http_cache_dir,
+            ttl=args.http_cache_ttl * 60 * 60,
+            max_bytes=args.http_cache_max_mb * 1024 * 1024
+        )
+
+    global search_engine, webscraper
+    if not args.no_search_cache:
+        search_engine = SearchEngine(cache=SearchCache(
+            cache_dir=os.path.join(parent_dir, '.cache', 'search'),
+            ttl=args.search_cache_ttl * 60 * 60,
+            max_entries=args.search_cache_max_entries
+        ))
+    webscraper = WebScraper(
+        max_concurrency=args.max_concurrency,
+        per_host_concurrency=args.per_host_concurrency,
+        per_host_delay=args.per_host_delay,
+        queue_size=args.queue_size,
+        use_process_pool=not args.inline_extraction,
+        extraction_workers=args.extraction_workers,
+        extraction_engine=args.extraction_engine,
+        http_cache=http_cache,
+        max_body_bytes=int(args.max_body_mb * 1024 * 1024),
+        domain_filter=domain_filter,
+        extract_documents=not args.skip_documents,
+        max_document_bytes=int(args.max_document_mb * 1024 * 1024),
+        max_document_pages=args.max_document_pages,
+        main_content=args.main_content
+    )
+
+    defaults = {
+        'skip_search': args.skip_search,
+        'skip_scrape': args.skip_scrape,
+        'skip_index': args.skip_index,
+        'crawl_depth': args.crawl_depth,
+        'max_pages': args.max_pages,
+        'per_domain_budget': args.per_domain_budget,
+        'dedup': not args.no_dedup,
+        'collapse_duplicates': args.collapse_duplicates,
+        'num_results': args.num_results,
+        'refresh_search': args.refresh_search,
+        'incremental': args.incremental,
+        'max_age_hours': args.max_age_hours,
+        'bulk_max_docs': args.bulk_max_docs,
+        'bulk_max_bytes': int(args.bulk_max_mb * 1024 * 1024),
+        'bulk_flush_seconds': args.bulk_flush_seconds,
+        'bulk_load': args.bulk_load,
+    }
+
+    async def run_and_close():
+        try:
+            if args.batch:
+                summaries = await run_batch(load_jobs(args.batch), defaults, args.max_concurrent_jobs)
+                if args.summary_out:
+                    with open(args.summary_out, 'w', encoding='utf-8') as f:
+                        for summary in summaries:
+                            f.write(json.dumps(summary) + '\n')
+            else:
+                await run(args.entity, args.query, **defaults)
+        finally:
+            await search_engine.close()
+            await webscraper.close_session()
+
+    try:
+        asyncio.run(run_and_close())
+    finally:
+        webscraper.close()
+        es_bulk_indexer.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
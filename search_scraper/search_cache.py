@@ -0,0 +1,92 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+# Request parameters that do not affect the results and must not split the cache
+IGNORED_PARAMS = {'key'}
+
+
+class SearchCache:
+    '''
+    Persistent cache of search API responses, keyed on the normalized query plus every
+    other request parameter (site restriction, paging, extra params). Entries expire
+    after ttl seconds; at most max_entries are kept, evicting the least recently used.
+    Hit and miss counts are kept for the lifetime of the instance.
+    '''
+    def __init__(self, cache_dir, ttl=24 * 60 * 60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'search_cache.db'), check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                response TEXT,
+                created_at REAL,
+                last_access REAL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(params):
+        normalized = {k: v for k, v in params.items() if k not in IGNORED_PARAMS}
+        normalized['q'] = ' '.join(str(normalized.get('q', '')).lower().split())
+        return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def get(self, params):
+        key = self.make_key(params)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute('SELECT response, created_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                self.misses += 1
+                return None
+            self.conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, params, response):
+        key = self.make_key(params)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO entries (key, response, created_at, last_access) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(response), now, now)
+            )
+            count = self.conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute(
+                    'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+            self.conn.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -1,5 +1,6 @@
 import os
-import requests
+import asyncio
+import aiohttp
 import traceback
 import logging
 from dotenv import load_dotenv
@@ -13,13 +14,39 @@ logging.basicConfig(level=logging.INFO,
 logger = logging.getLogger(__name__)
 
 class SearchEngine:
-    def __init__(self):
+    # Custom Search returns at most 10 results per call and 100 per query
+    PAGE_SIZE = 10
+    MAX_RESULTS = 100
+
+    def __init__(self, max_concurrent_pages=5, timeout=30, cache=None):
         self.api_key = os.environ.get('GOOGLE_SE_API_KEY')
         self.search_engine_id = os.environ.get('GOOGLE_SE_ID')
         self.base_url = "https://www.googleapis.com/customsearch/v1"
+        self.max_concurrent_pages = max_concurrent_pages
+        self.timeout = timeout
+        self.cache = cache
         self.logger = logging.getLogger(__name__)
+        self._session = None
+
+    def _get_session(self):
+        # One pooled session for all pages and queries; created lazily on the running loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrent_pages, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
 
-    def google_custom_search(self, query, num=10, site_restrict=None, **params):
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self.cache is not None:
+            stats = self.cache.stats()
+            self.logger.info(f"Search cache: {stats['hits']} hits, {stats['misses']} misses "
+                             f"({stats['hit_rate']:.0%}); {stats['hits']} API calls saved")
+
+    def build_params(self, query, num=10, site_restrict=None, **params):
         '''
         site_restrict (str or list, optional): Restricts the search to specific sites or domains. Defaults to None.
             Can be used in the following ways:
@@ -53,14 +80,33 @@ class SearchEngine:
             
         # Update with any additional parameters
         default_params.update(params)
+        return default_params
+
+    async def google_custom_search(self, query, num=10, site_restrict=None, bypass_cache=False, **params):
+        '''
+        Fetch a single page of results. See build_params for site_restrict.
+        With a cache configured, cached responses are served unless bypass_cache is set;
+        fresh responses are always stored.
+        Returns the API response JSON, or None on error.
+        '''
+        request_params = self.build_params(query, num=num, site_restrict=site_restrict, **params)
+
+        if self.cache is not None and not bypass_cache:
+            cached = await asyncio.to_thread(self.cache.get, request_params)
+            if cached is not None:
+                self.logger.info(f"Search cache hit for query: {query} (start={request_params.get('start', 1)})")
+                return cached
         
         try:
-            self.logger.info(f"Sending API request for query: {query}")
-            response = requests.get(self.base_url, params=default_params)
-            response.raise_for_status()
+            self.logger.info(f"Sending API request for query: {query} (start={request_params.get('start', 1)})")
+            async with self._get_session().get(self.base_url, params=request_params) as response:
+                response.raise_for_status()
+                result = await response.json()
             self.logger.info(f"API request successful for query: {query}")
-            return response.json()
-        except requests.RequestException as e:
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.put, request_params, result)
+            return result
+        except aiohttp.ClientError as e:
             self.logger.error(f"API request error for query '{query}': {str(e)}")
             self.logger.debug(traceback.format_exc())
             return None
@@ -72,3 +118,39 @@ class SearchEngine:
             self.logger.error(f"Unexpected error for query '{query}': {str(e)}")
             self.logger.debug(traceback.format_exc())
             return None
+
+    async def iter_search(self, query, num_results=10, site_restrict=None, bypass_cache=False, **params):
+        '''
+        Yield up to num_results unique result items (by link) as their pages arrive.
+        Pages (start=1, 11, 21, ...) are requested concurrently, at most
+        max_concurrent_pages at a time.
+        '''
+        num_results = min(num_results, self.MAX_RESULTS)
+        semaphore = asyncio.Semaphore(self.max_concurrent_pages)
+
+        async def fetch_page(start):
+            async with semaphore:
+                num = min(self.PAGE_SIZE, num_results - start + 1)
+                return await self.google_custom_search(query, num=num, site_restrict=site_restrict,
+                                                       bypass_cache=bypass_cache, start=start, **params)
+
+        tasks = [asyncio.create_task(fetch_page(start)) for start in range(1, num_results + 1, self.PAGE_SIZE)]
+        seen_links = set()
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                page = await next_page
+                if not page:
+                    continue
+                for item in page.get('items', []):
+                    if item.get('link') and item['link'] not in seen_links:
+                        seen_links.add(item['link'])
+                        yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def search(self, query, num_results=10, site_restrict=None, bypass_cache=False, **params):
+        '''Collect iter_search results into the {'items': [...]} shape of a single API response.'''
+        items = [item async for item in self.iter_search(query, num_results, site_restrict, bypass_cache, **params)]
+        self.logger.info(f"Search for '{query}' returned {len(items)} unique results")
+        return {'items': items}
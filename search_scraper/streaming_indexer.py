@@ -0,0 +1,99 @@
+import json
+import time
+import asyncio
+import logging
+import traceback
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+
+class StreamingIndexer:
+    '''
+    Indexes documents while they are still being scraped. Documents go through a
+    bounded queue to a background task that bulk-uploads a batch whenever it reaches
+    max_docs documents or max_bytes of JSON, or flush_interval seconds after the
+    batch started. Memory stays flat however many documents pass through, and every
+    flushed batch is durable even if the run dies later.
+
+    Usage:
+        indexer = StreamingIndexer(es_bulk_indexer, index_name)
+        indexer.start()
+        await indexer.put(doc)
+        indexed = await indexer.close()
+    '''
+    def __init__(self, es_bulk_indexer, index_name, id_col='link', max_docs=100,
+                 max_bytes=5 * 1024 * 1024, flush_interval=10.0, queue_size=200):
+        self.es_bulk_indexer = es_bulk_indexer
+        self.index_name = index_name
+        self.id_col = id_col
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.indexed = 0
+        self.flushes = 0
+        self.logger = logging.getLogger(__name__)
+        self._queue = None
+        self._worker = None
+        self._closed = object()
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker = asyncio.create_task(self._consume())
+
+    async def put(self, doc):
+        # Blocks while the queue is full, which pushes back on the scraper
+        await self._queue.put(doc)
+
+    async def close(self):
+        '''Flush what is left and stop. Returns the number of documents indexed.'''
+        await self._queue.put(self._closed)
+        await self._worker
+        self.logger.info(f"Streamed {self.indexed} documents to {self.index_name} in {self.flushes} bulk requests")
+        return self.indexed
+
+    async def _flush(self, batch, reason):
+        if not batch:
+            return
+        try:
+            success = await asyncio.to_thread(
+                self.es_bulk_indexer.bulk_upload_documents,
+                index_name=self.index_name,
+                documents=batch,
+                id_col=self.id_col
+            )
+            self.indexed += success
+            self.flushes += 1
+            self.logger.info(f"Flushed {len(batch)} documents to {self.index_name} ({reason})")
+        except Exception as e:
+            self.logger.error(f"Error flushing {len(batch)} documents to {self.index_name}: {str(e)}")
+            self.logger.debug(traceback.format_exc())
+
+    async def _consume(self):
+        batch = []
+        batch_bytes = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                doc = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                await self._flush(batch, "timer")
+                batch, batch_bytes, deadline = [], 0, None
+                continue
+
+            if doc is self._closed:
+                await self._flush(batch, "final")
+                return
+
+            batch.append(doc)
+            batch_bytes += len(json.dumps(doc, default=str))
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.max_docs or batch_bytes >= self.max_bytes:
+                await self._flush(batch, "size")
+                batch, batch_bytes, deadline = [], 0, None
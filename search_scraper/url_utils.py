@@ -0,0 +1,38 @@
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track the click and never change the page content
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'ref_src'}
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def normalize_url(url):
+    '''
+    Canonical form of a URL for use as a cache or seen-set key: lowercased scheme and
+    host, default port and fragment dropped, tracking parameters removed and the
+    remaining query parameters sorted.
+    '''
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    host, _, port = netloc.rpartition(':')
+    if host and DEFAULT_PORTS.get(scheme) == port:
+        netloc = host
+    path = parts.path or '/'
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+@lru_cache(maxsize=65536)
+def url_host(url):
+    '''Lowercased hostname of a URL (no port or credentials), or '' if it has none.'''
+    try:
+        return urlsplit(url).hostname or ''
+    except ValueError:
+        return ''
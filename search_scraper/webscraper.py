@@ -1,14 +1,20 @@
+import os
 import asyncio
 import aiohttp
-import random
 import logging
-from urllib.parse import urlparse, urljoin
+from functools import partial
 import traceback
 import time
+from datetime import datetime, timezone
 import nest_asyncio
-from bs4 import BeautifulSoup
-import html2text
-import re
+from fetch_scheduler import FetchScheduler
+from extraction_pool import ExtractionPool
+import extractor
+from body_reader import read_text, BodyTooLarge, UnsupportedContent, DocumentContent
+from document_extractor import extract_document, spool_to_file, document_kind, DOCUMENT_ENGINE
+from domain_filter import DomainFilter
+from frontier import CrawlFrontier
+from url_utils import normalize_url
 
 nest_asyncio.apply()
 
@@ -18,20 +24,71 @@ logging.basicConfig(level=logging.INFO,
                     datefmt='%Y-%m-%d %H:%M:%S')
 logger = logging.getLogger(__name__)
 
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+}
+
+async def iter_items(items):
+    '''Iterate a list or an async iterable of items (e.g. SearchEngine.iter_search) alike.'''
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+def utc_now():
+    '''Current time as an ISO 8601 string, as stored in fetched_at.'''
+    return datetime.now(timezone.utc).isoformat()
+
 class WebScraper:
-    def __init__(self):
+    def __init__(self, max_concurrency=10, per_host_concurrency=2, per_host_delay=1.0, queue_size=100,
+                 use_process_pool=True, extraction_workers=None, extraction_engine='fast', http_cache=None,
+                 max_body_bytes=10 * 1024 * 1024, domain_filter=None,
+                 extract_documents=True, max_document_bytes=50 * 1024 * 1024, max_document_pages=200,
+                 main_content=False):
         self.logger = logging.getLogger(__name__)
-        self.social_media_domains = [
-            'facebook.com', 'twitter.com', 'instagram.com', 'linkedin.com',
-            'pinterest.com', 'reddit.com', 'tumblr.com', 'snapchat.com',
-            'tiktok.com', 'youtube.com', 'whatsapp.com', 'telegram.org',
-            'medium.com', 'quora.com'
-        ]
+        self.scheduler = FetchScheduler(
+            max_concurrency=max_concurrency,
+            per_host_concurrency=per_host_concurrency,
+            per_host_delay=per_host_delay,
+            queue_size=queue_size
+        )
+        # One filter serves both the pre-fetch check and link extraction in the workers
+        self.domain_filter = domain_filter or DomainFilter(deny_domains=extractor.SOCIAL_MEDIA_DOMAINS)
+        self.extraction_pool = ExtractionPool(
+            max_workers=extraction_workers,
+            use_processes=use_process_pool,
+            initializer=extractor.configure_link_filter,
+            initargs=(self.domain_filter,)
+        )
+        self.extract_fn = extractor.get_extraction_engine(extraction_engine)
+        self.main_content = main_content
+        self.http_cache = http_cache
+        self.max_body_bytes = max_body_bytes
+        self.extract_documents = extract_documents
+        self.max_document_bytes = max_document_bytes
+        self.max_document_pages = max_document_pages
+        self._session = None
+
+    def _get_session(self):
+        # One pooled session shared by every scrape and crawl in the process; created lazily on the running loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close_session(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def engine_tag(self):
+        # Identifies how a cached body was extracted, so a change of engine or mode re-extracts
+        return f"{self.extract_fn.__name__}+main" if self.main_content else self.extract_fn.__name__
 
     def is_social_media(self, url):
-        parsed_url = urlparse(url)
-        domain = parsed_url.netloc.lower()
-        return any(social_domain in domain for social_domain in self.social_media_domains)
+        return self.domain_filter.is_blocked(url)
 
     async def fetch_and_process_url(self, session, url, headers):
         try:
@@ -39,101 +96,253 @@ class WebScraper:
                 self.logger.info(f"Skipping social media site: {url}")
                 return None
 
+            engine = self.engine_tag
+            cached = await asyncio.to_thread(self.http_cache.get, url) if self.http_cache else None
+            if cached and self.http_cache.is_fresh(cached):
+                self.logger.info(f"Serving from cache: {url}")
+                return await self._cached_result(url, cached, engine)
+
+            request_headers = dict(headers)
+            if cached:
+                request_headers.update(self.http_cache.conditional_headers(cached))
+
             self.logger.info(f"Fetching URL: {url}")
-            async with session.get(url, headers=headers, timeout=30) as response:
-                # Check if the content is PDF
-                content_type = response.headers.get('Content-Type', '').lower()
-                if 'application/pdf' in content_type:
-                    self.logger.info(f"Skipping PDF content: {url}")
+            async with session.get(url, headers=request_headers, timeout=30) as response:
+                if response.status == 304 and cached:
+                    self.logger.info(f"Not modified, serving from cache: {url}")
+                    await asyncio.to_thread(self.http_cache.touch, url)
+                    return await self._cached_result(url, cached, engine)
+
+                try:
+                    content, content_type = await read_text(response, self.max_body_bytes)
+                except DocumentContent as e:
+                    return await self.fetch_document(response, url, e.content_type, e.first_chunk)
+                except (BodyTooLarge, UnsupportedContent) as e:
+                    self.logger.info(f"Skipping {url}: {str(e)}")
                     return None
-                
-                content = await response.text()
-                return self.extract_content(content, url)
+                result = await self.extraction_pool.run(
+                    self.extract_fn, content, url, self.main_content
+                )
+                if self.http_cache and response.status == 200:
+                    await asyncio.to_thread(self.http_cache.put, url, content, response.headers, engine, result)
+                return result
         except Exception as e:
             self.logger.error(f"Error fetching {url}: {str(e)}")
             self.logger.debug(traceback.format_exc())
             return None
 
-    def extract_content(self, html_content, base_url):
-        self.logger.info(f"Extracting content from {base_url}")
-        
-        def clean_text(text):
-            return re.sub(r'\s+', ' ', text).strip()
-
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Extract all visible text
-        h = html2text.HTML2Text()
-        h.ignore_links = True
-        h.ignore_images = True
-        all_text = clean_text(h.handle(str(soup)))
-        
-        # Extract links
-        links = []
-        seen_urls = set()
-        for a in soup.find_all('a', href=True):
-            href = a.get('href')
-            full_url = urljoin(base_url, href)
-            if full_url not in seen_urls and not self.is_social_media(full_url):
-                links.append({'text': clean_text(a.text), 'href': full_url})
-                seen_urls.add(full_url)
-        
-        return {
-            'link': base_url,
-            'all_text': all_text,
-            'links': links,
-        }
+    async def fetch_document(self, response, url, content_type, first_chunk):
+        if not self.extract_documents or document_kind(content_type) is None:
+            self.logger.info(f"Skipping document content ({content_type}): {url}")
+            return None
 
-    async def scrape_urls(self, items):
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        }
+        self.logger.info(f"Streaming document ({content_type}): {url}")
+        try:
+            path = await spool_to_file(response, self.max_document_bytes, first_chunk=first_chunk)
+        except ValueError as e:
+            self.logger.info(f"Skipping {url}: {str(e)}")
+            return None
+        try:
+            result = await self.extraction_pool.run(
+                extract_document, path, url, content_type, self.max_document_pages
+            )
+        finally:
+            os.remove(path)
 
-        total_urls = len(items)
-        self.logger.info(f"Starting to scrape {total_urls} URLs")
+        if self.http_cache and response.status == 200 and result is not None:
+            # Only the extracted text is kept; the binary body is not cached, so a failed
+            # extraction leaves nothing to re-extract from and is not cached either
+            await asyncio.to_thread(self.http_cache.put, url, '', response.headers, DOCUMENT_ENGINE, result)
+        return result
+
+    async def _cached_result(self, url, cached, engine):
+        if cached['extracted'] is not None and cached['engine'] in (engine, DOCUMENT_ENGINE):
+            return cached['extracted']
+        # Cached body was extracted by a different engine; re-extract without refetching
+        result = await self.extraction_pool.run(
+            self.extract_fn, cached['body'], url, self.main_content
+        )
+        await asyncio.to_thread(self.http_cache.update_extracted, url, engine, result)
+        return result
+
+    def extract_content(self, html_content, base_url):
+        return self.extract_fn(html_content, base_url, self.main_content)
+
+    async def iter_scrape(self, items):
+        '''
+        Scrape a list or async iterable of search items, yielding each item (updated in
+        place with the extracted content) as soon as its fetch finishes. Failed items are
+        yielded unchanged. Results wait in a queue bounded by the scheduler's queue size,
+        so a slow consumer holds back fetching instead of buffering pages.
+        '''
+        if isinstance(items, list):
+            self.logger.info(f"Starting to scrape {len(items)} URLs")
+        else:
+            self.logger.info("Starting to scrape URLs as they arrive")
         start_time = time.time()
 
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for item in items:
-                url = item['link']
-                delay = random.uniform(1, 3)
-                await asyncio.sleep(delay)
-                task = asyncio.create_task(self.fetch_and_process_url(session, url, headers))
-                tasks.append((item, task))
-
-            successful_scrapes = 0
-            failed_scrapes = 0
-            skipped_pdfs = 0
-            skipped_social_media = 0
-
-            for item, task in tasks:
-                try:
-                    result = await task
-                    if result:
-                        item.update(result)
-                        successful_scrapes += 1
-                        self.logger.info(f"Successfully scraped: {item['link']}")
-                    else:
-                        if self.is_social_media(item['link']):
-                            skipped_social_media += 1
-                            self.logger.info(f"Skipped social media site: {item['link']}")
-                        elif 'application/pdf' in item.get('content_type', '').lower():
-                            skipped_pdfs += 1
-                            self.logger.info(f"Skipped PDF: {item['link']}")
-                        else:
-                            failed_scrapes += 1
-                            self.logger.warning(f"Failed to scrape: {item['link']}")
-                except Exception as e:
+        session = self._get_session()
+        results = asyncio.Queue(maxsize=self.scheduler.queue_size)
+        tasks = set()
+
+        async def fetch(item):
+            try:
+                result = await self.fetch_and_process_url(session, item['link'], DEFAULT_HEADERS)
+            except Exception as e:
+                result = e
+            await results.put((item, result))
+
+        async def feed():
+            nonlocal submitted
+            try:
+                # Fetches start as soon as each item arrives, so a streamed source overlaps with scraping
+                async for item in iter_items(items):
+                    task = await self.scheduler.submit(item['link'], partial(fetch, item))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    submitted += 1
+            except Exception as e:
+                self.logger.error(f"Error reading items to scrape: {str(e)}")
+                self.logger.debug(traceback.format_exc())
+
+        submitted = 0
+        received = 0
+        feeder = asyncio.create_task(feed())
+        next_result = None
+        successful_scrapes = 0
+        failed_scrapes = 0
+        skipped_social_media = 0
+
+        try:
+            while not (feeder.done() and received == submitted):
+                if next_result is None:
+                    next_result = asyncio.ensure_future(results.get())
+                if not feeder.done():
+                    # Wake up for a result, or when feeding ends so the loop can finish
+                    await asyncio.wait({next_result, feeder}, return_when=asyncio.FIRST_COMPLETED)
+                    if not next_result.done():
+                        continue
+                item, result = await next_result
+                next_result = None
+                received += 1
+
+                if isinstance(result, Exception):
                     failed_scrapes += 1
-                    self.logger.error(f"Error scraping {item['link']}: {str(e)}")
-                    self.logger.debug(f"Traceback for {item['link']}:\n{traceback.format_exc()}")
+                    self.logger.error(f"Error scraping {item['link']}: {str(result)}")
+                elif result:
+                    item.update(result)
+                    item['fetched_at'] = utc_now()
+                    successful_scrapes += 1
+                    self.logger.info(f"Successfully scraped: {item['link']}")
+                elif self.is_social_media(item['link']):
+                    skipped_social_media += 1
+                    self.logger.info(f"Skipped social media site: {item['link']}")
+                else:
+                    failed_scrapes += 1
+                    self.logger.warning(f"Failed to scrape: {item['link']}")
+                yield item
+        finally:
+            # Consumer stopped early: do not leave fetches blocked on the full queue, and wait
+            # for them to unwind before the session or extraction pool can be closed
+            pending = [feeder, *tasks]
+            if next_result is not None:
+                pending.append(next_result)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        total_time = time.time() - start_time
+        self.logger.info(f"Completed scraping {received} URLs in {total_time:.2f} seconds")
+        self.logger.info(f"Successful scrapes: {successful_scrapes}, Failed scrapes: {failed_scrapes}, Skipped social media: {skipped_social_media}")
+
+    async def scrape_urls(self, items):
+        '''
+        Scrape all items and return them in input order (e.g. search ranking), unlike
+        iter_scrape, which yields them as their fetches finish.
+        '''
+        order = {}
+
+        async def numbered(items):
+            async for item in iter_items(items):
+                order[id(item)] = len(order)
+                yield item
 
-        end_time = time.time()
-        total_time = end_time - start_time
-        self.logger.info(f"Completed scraping {total_urls} URLs in {total_time:.2f} seconds")
-        self.logger.info(f"Successful scrapes: {successful_scrapes}, Failed scrapes: {failed_scrapes}, Skipped PDFs: {skipped_pdfs}, Skipped social media: {skipped_social_media}")
-        return items
+        if isinstance(items, list):
+            order = {id(item): i for i, item in enumerate(items)}
+        else:
+            items = numbered(items)
+        results = [item async for item in self.iter_scrape(items)]
+        return sorted(results, key=lambda item: order[id(item)])
 
     async def scrape_urls_from_list(self, items):
-        return await self.scrape_urls(items)
\ No newline at end of file
+        return await self.scrape_urls(items)
+
+    async def iter_crawl(self, items, max_depth=1, max_pages=200, per_domain_budget=20, query=None):
+        '''
+        Crawl outward from the given search items, following extracted links up to
+        max_depth hops and max_pages fetches in total. Links are prioritised by relevance
+        to query and capped per domain. Yields each scraped item as it finishes; seed
+        items are updated in place as in scrape_urls, discovered pages are new items.
+        '''
+        frontier = CrawlFrontier(
+            max_depth=max_depth,
+            per_domain_budget=per_domain_budget,
+            query=query,
+            domain_filter=self.domain_filter
+        )
+        seeds = {}
+        for item in items:
+            if frontier.add(item['link'], depth=0, seed=True):
+                seeds[normalize_url(item['link'])] = item
+
+        self.logger.info(f"Starting crawl from {len(seeds)} seeds (max depth {max_depth}, max pages {max_pages})")
+        start_time = time.time()
+        scheduled = 0
+        scraped = 0
+        in_flight = {}
+
+        session = self._get_session()
+        try:
+            while in_flight or (len(frontier) and scheduled < max_pages):
+                # Keep the scheduler fed without exceeding its pending queue
+                while len(frontier) and scheduled < max_pages and len(in_flight) < self.scheduler.queue_size:
+                    url, depth = frontier.pop()
+                    task = await self.scheduler.submit(url, partial(self.fetch_and_process_url, session, url, DEFAULT_HEADERS))
+                    in_flight[task] = (url, depth)
+                    scheduled += 1
+
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    url, depth = in_flight.pop(task)
+                    result = task.result()
+                    item = seeds.get(normalize_url(url)) or {'link': url}
+                    if not result:
+                        if depth == 0:
+                            yield item
+                        continue
+
+                    item.update(result)
+                    item['fetched_at'] = utc_now()
+                    item['crawl_depth'] = depth
+                    scraped += 1
+                    if depth < max_depth:
+                        for link in result.get('links', []):
+                            frontier.add(link['href'], depth + 1, anchor_text=link['text'])
+                    yield item
+        finally:
+            # Consumer stopped early or a fetch failed: do not leave fetches holding scheduler slots
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+        self.logger.info(f"Crawl finished in {time.time() - start_time:.2f} seconds: "
+                         f"fetched {scheduled} URLs, scraped {scraped} pages, {len(frontier)} left in frontier")
+
+    async def crawl(self, items, max_depth=1, max_pages=200, per_domain_budget=20, query=None):
+        return [item async for item in self.iter_crawl(items, max_depth, max_pages, per_domain_budget, query)]
+
+    def close(self):
+        self.extraction_pool.shutdown()
+        if self.http_cache:
+            self.http_cache.close()